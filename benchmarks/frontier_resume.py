@@ -0,0 +1,94 @@
+"""
+Startup time of the frontier when resuming from a large SQLite save file:
+time until the first url can be handed out, and until every pending url is
+queued. Compared with the previous resume, which scanned every record of
+the save file and ran is_valid on the pending ones before returning.
+
+    python benchmarks/frontier_resume.py [--urls 1000000] [--pending 0.1]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils import get_urlhash
+
+
+def build_save(path, count, pending):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE urls (urlhash TEXT PRIMARY KEY, url TEXT NOT NULL, "
+        "completed INTEGER NOT NULL, depth INTEGER NOT NULL DEFAULT 0)")
+    every = max(1, round(1 / pending)) if pending else count + 1
+    rows = (
+        (get_urlhash(url), url, int(i % every != 0), i % 7)
+        for i, url in (
+            (i, f"https://www.ics.uci.edu/page/{i % 5000}/{i}") for i in range(count)))
+    conn.executemany("INSERT INTO urls VALUES (?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def legacy_parse_save_file(frontier):
+    from scraper import is_valid
+    for record in frontier.save.values():
+        url, completed, depth = (tuple(record) + (0,))[:3]
+        if not completed and is_valid(url):
+            frontier._queue(url, depth)
+
+
+def run(config, legacy):
+    from crawler.frontier import Frontier
+
+    class LegacyFrontier(Frontier):
+        def _load_save_file(self):
+            legacy_parse_save_file(self)
+
+    start = time.perf_counter()
+    frontier = (LegacyFrontier if legacy else Frontier)(config, False)
+    url = frontier.get_tbd_url()
+    first = time.perf_counter() - start
+    while True:
+        with frontier.lock:
+            if not frontier.loading:
+                break
+        time.sleep(0.01)
+    loaded = time.perf_counter() - start
+    queued = len(frontier.to_be_downloaded) + 1
+    # Closed without completing url, the next run finds the same file.
+    frontier.close()
+    return first, loaded, queued
+
+
+def main(count, pending):
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        from utils.config import Config
+        cparser = ConfigParser()
+        cparser.read(os.path.join(ROOT, "config.ini"))
+        cparser["ROBOTS"]["ENABLED"] = "false"
+        config = Config(cparser)
+        build_save(config.save_file, count, pending)
+        # Both runs start from an indexed save file with a valid .seen file.
+        from crawler.frontier import Frontier
+        Frontier(config, False).close()
+
+        for name, legacy in (("full scan", True), ("chunked", False)):
+            first, loaded, queued = run(config, legacy)
+            print(f"{name:>10}: first url after {first:7.3f}s, "
+                  f"{queued} pending urls queued after {loaded:7.3f}s "
+                  f"({count} urls in the save file)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--urls", type=int, default=1000000)
+    parser.add_argument("--pending", type=float, default=0.1)
+    args = parser.parse_args()
+    main(args.urls, args.pending)
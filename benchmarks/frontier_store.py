@@ -0,0 +1,52 @@
+"""
+Compares frontier save file backends: ops/sec for the add_url and
+mark_url_complete write pattern (one sync per write, as the frontier does).
+
+    python benchmarks/frontier_store.py [--urls 2000]
+"""
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.store import open_store
+from utils import get_urlhash
+
+
+def run(backend, urls, directory):
+    config = SimpleNamespace(
+        save_file=os.path.join(directory, f"bench-{backend}"),
+        save_backend=backend, save_commit_ops=500, save_commit_ms=1000)
+    save = open_store(config)
+    hashes = [(get_urlhash(url), url) for url in urls]
+
+    start = time.perf_counter()
+    for urlhash, url in hashes:
+        if urlhash not in save:
+            save[urlhash] = (url, False, 0)
+            save.sync()
+    for urlhash, url in hashes:
+        save[urlhash] = (url, True, 0)
+        save.sync()
+    save.close()
+    elapsed = time.perf_counter() - start
+    return 2 * len(hashes) / elapsed
+
+
+def main(count):
+    urls = [f"https://www.ics.uci.edu/page/{i}?q={i % 97}" for i in range(count)]
+    with tempfile.TemporaryDirectory() as directory:
+        for backend in ("shelve", "sqlite"):
+            ops = run(backend, urls, directory)
+            print(f"{backend:>7}: {ops:12,.0f} ops/sec ({count} urls)")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--urls", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.urls)
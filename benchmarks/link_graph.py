@@ -0,0 +1,99 @@
+"""
+Memory and time of crawler/links.py for a synthetic link graph: recording
+the links, merging them into the in-link arrays and computing PageRank,
+with numpy and in pure Python.
+
+    python benchmarks/link_graph.py [--pages 200000] [--links 15] [--backend numpy]
+
+Each page links to 0 to 2 * --links pages, picked with a power law so a
+few index pages are linked from everywhere, like a crawled site.
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import crawler.links as links
+from crawler.links import LinkGraph
+
+BATCHES = 4
+
+
+def synthetic_links(pages, per_page):
+    rng = random.Random(121)
+    urls = [
+        f"https://lab{i % 60}.ics.uci.edu/~user{i % 900}/pages/{i}.html"
+        for i in range(pages)]
+    for source in range(pages):
+        for _ in range(rng.randint(0, 2 * per_page)):
+            # Pareto distributed target ids: low ids get most links.
+            target = min(int(rng.paretovariate(0.8)) - 1, pages - 1)
+            yield urls[source], urls[target]
+
+
+def build(edges):
+    """ The graph of edges, recorded and merged in BATCHES rankings. """
+    graph = LinkGraph(os.devnull)
+    step = len(edges) // BATCHES + 1
+    add_time = merge_time = 0.0
+    for start in range(0, len(edges), step):
+        begin = time.perf_counter()
+        for source, target in edges[start:start + step]:
+            graph.add_link(source, target)
+        add_time += time.perf_counter() - begin
+        node_count, new_sources, new_targets, _ = graph.take_links()
+        begin = time.perf_counter()
+        graph.row_ptr, graph.sources = links.merge_links(
+            graph.row_ptr, graph.sources, node_count, new_sources, new_targets)
+        merge_time += time.perf_counter() - begin
+    return graph, add_time, merge_time
+
+
+def graph_memory(edges):
+    tracemalloc.start()
+    graph = build(edges)[0]
+    graph_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return graph_bytes
+
+
+def main(pages, per_page, backends):
+    edges = list(synthetic_links(pages, per_page))
+    graph_bytes = graph_memory(edges)
+    numpy = links.numpy
+    ranks = dict()
+    for name in backends:
+        if name == "numpy" and numpy is None:
+            print("numpy: not installed")
+            continue
+        links.numpy = numpy if name == "numpy" else None
+        graph, add_time, merge_time = build(edges)
+        start = time.perf_counter()
+        ranks[name] = links.pagerank(
+            graph.row_ptr, graph.sources, graph.out_degree, tolerance=0)
+        rank_time = time.perf_counter() - start
+        print(f"{name:>6}: add {len(edges) / add_time:9,.0f} links/s, "
+              f"merge {merge_time:6.2f}s, PageRank {rank_time:6.2f}s "
+              f"({graph.iterations} iterations)")
+    links.numpy = numpy
+    arrays = (graph.row_ptr, graph.sources, graph.in_degree, graph.out_degree, graph.digests)
+    array_bytes = sum(len(values) * values.itemsize for values in arrays)
+    print(f"{len(graph)} pages, {len(edges)} links: {graph_bytes / 2 ** 20:.1f} MiB, "
+          f"{graph_bytes / len(edges):.1f} bytes/link "
+          f"({array_bytes / len(edges):.1f} in arrays, the rest in the url index)")
+    if len(ranks) == 2:
+        difference = max(abs(a - b) for a, b in zip(ranks["numpy"], ranks["python"]))
+        assert difference < 1e-9, "ranks differ"
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200000)
+    parser.add_argument("--links", type=int, default=15)
+    parser.add_argument("--backend", choices=("numpy", "python"), action="append")
+    args = parser.parse_args()
+    main(args.pages, args.links, args.backend or ("numpy", "python"))
@@ -0,0 +1,113 @@
+"""
+Size on disk and scan time of utils/page_store.py against the two
+"url,count" text files the scraper wrote before, for a synthetic crawl:
+recording every page, reading back the urls (which the visited index
+canonicalizes) and computing the report's
+longest pages and pages per subdomain.
+
+    python benchmarks/page_store.py [--pages 200000]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.page_store import PageStore, read_count_file
+from utils.report import CrawlReport
+from utils.visited import canonicalize
+
+COUNT_FILES = ("all_webpage_count.txt", "all_webpage_count_no_stopwords.txt")
+
+
+def synthetic_pages(count):
+    rng = random.Random(121)
+    hosts = [f"{name}.ics.uci.edu" for name in (
+        "www", "cml", "vision", "sdcl", "hpi", "grape", "wics", "isg", "mlphysics")]
+    hosts += [f"lab{i}.ics.uci.edu" for i in range(40)] + ["www.stat.uci.edu", "www.cs.uci.edu"]
+    for i in range(count):
+        host = rng.choice(hosts)
+        words = rng.randint(100, 20000)
+        url = f"https://{host}/~user{i % 900}/research/projects/{i}/index.html"
+        if i % 7 == 0:
+            url += f"?page={i % 13}&sort=date"
+        yield url, words, words * 3 // 5, f"{rng.getrandbits(128):032x}"
+
+
+def legacy_write(pages):
+    for url, words, words_nostop, _ in pages:
+        with open(COUNT_FILES[0], "a") as file:
+            file.write(f"{url},{words}\n")
+        with open(COUNT_FILES[1], "a") as file:
+            file.write(f"{url},{words_nostop}\n")
+
+
+def legacy_urls():
+    with open(COUNT_FILES[0]) as file:
+        return [line.rsplit(",", 1)[0] for line in file]
+
+
+def legacy_report():
+    report = CrawlReport()
+    seen = set()
+    for url, words in read_count_file(COUNT_FILES[0]):
+        canonical = canonicalize(url)
+        if canonical not in seen:
+            seen.add(canonical)
+            report.add_page(url, words)
+    return report
+
+
+def store_write(pages):
+    store = PageStore("page_records.bin")
+    for url, words, words_nostop, digest in pages:
+        store.add(url, words, words_nostop, digest)
+    store.close()
+
+
+def store_urls():
+    return list(PageStore("page_records.bin").urls())
+
+
+def store_report():
+    report = CrawlReport()
+    report.add_pages(PageStore("page_records.bin"))
+    return report
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main(count):
+    pages = list(synthetic_pages(count))
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        results = dict()
+        for name, write, read_urls, report in (
+                ("text files", legacy_write, legacy_urls, legacy_report),
+                ("page store", store_write, store_urls, store_report)):
+            _, write_time = timed(write, pages)
+            urls, urls_time = timed(read_urls)
+            built, report_time = timed(report)
+            files = COUNT_FILES if name == "text files" else ("page_records.bin",)
+            size = sum(os.path.getsize(path) for path in files)
+            # Pages with the same word count may be picked in another order.
+            results[name] = (
+                urls, built.unique_pages, max(built.longest)[0], built.subdomains)
+            print(f"{name:>10}: {size / count:6.1f} bytes/page, "
+                  f"write {write_time:6.2f}s, read urls {urls_time:6.3f}s, "
+                  f"report {report_time:6.3f}s ({count} pages)")
+        assert results["text files"] == results["page store"], "results differ"
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.pages)
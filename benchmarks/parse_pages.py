@@ -0,0 +1,96 @@
+"""
+Per-page parse time and peak memory of the single-pass page parser against
+the previous BeautifulSoup path (one soup, get_text twice, find_all('a')
+and the robots meta lookup).
+
+    python benchmarks/parse_pages.py [--fixtures DIR] [--repeat 5]
+
+DIR holds saved html pages (*.html / *.htm). Without it a set of synthetic
+pages of increasing size is used.
+"""
+import glob
+import os
+import random
+import sys
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.page_parser import parse_page, etree
+
+
+def legacy_parse(content):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, 'html.parser')
+    doc_words = soup.get_text(separator=" ").split()
+    robot = soup.find('meta', attrs={'name': 'robots'})
+    hrefs = [link['href'] for link in soup.find_all('a', href=True)]
+    tokens = soup.get_text(separator=" ").split()
+    return doc_words, robot, hrefs, tokens
+
+
+def synthetic_pages():
+    rng = random.Random(121)
+    vocabulary = [f"word{i}" for i in range(5000)]
+    pages = list()
+    for paragraphs in (10, 100, 1000):
+        body = list()
+        for i in range(paragraphs):
+            text = " ".join(rng.choice(vocabulary) for _ in range(40))
+            body.append(
+                f"<div class='p'><p>{text} <b>bold</b></p>"
+                f"<a href='/page/{i}'>link {i}</a></div>")
+        pages.append((
+            f"synthetic-{paragraphs}",
+            ("<html><head><title>page</title>"
+             "<meta name='robots' content='index, follow'>"
+             "<script>var x = 1;</script></head><body>"
+             + "".join(body) + "</body></html>").encode("utf-8")))
+    return pages
+
+
+def fixture_pages(directory):
+    pages = list()
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def measure(function, content, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(content)
+    elapsed = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    function(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000, peak / 1024
+
+
+def main(fixtures, repeat):
+    pages = fixture_pages(fixtures) if fixtures else synthetic_pages()
+    # The scraper goes through the words of every page it keeps.
+    paths = [("beautifulsoup", legacy_parse),
+             ("html.parser", lambda c: parse_page(c, "html.parser").words)]
+    if etree is not None:
+        paths.append(("lxml", lambda c: parse_page(c, "lxml").words))
+    print(f"{'page':<24}{'bytes':>10}  "
+          + "".join(f"{name + ' ms':>18}{'KiB':>10}" for name, _ in paths))
+    for name, content in pages:
+        row = f"{name:<24}{len(content):>10}  "
+        for _, function in paths:
+            ms, kib = measure(function, content, repeat)
+            row += f"{ms:>18.2f}{kib:>10.0f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--fixtures", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.fixtures, args.repeat)
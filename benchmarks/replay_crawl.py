@@ -0,0 +1,82 @@
+"""
+Repeatable end-to-end crawl benchmark: replays responses recorded with
+RECORDMODE = record (see config.ini) through the full crawler, without the
+cache server or politeness delays, and reports pages/sec and where the time
+went per stage. Runs in a scratch directory, so the crawl's own save and
+statistics files are not touched.
+
+    python benchmarks/replay_crawl.py [--config_file config.ini]
+        [--record_dir recorded] [--seeds url,url]
+"""
+import atexit
+import os
+import sys
+import tempfile
+import time
+from argparse import ArgumentParser
+from configparser import ConfigParser
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def has_robots(record_dir):
+    """ Whether the recording holds robots.txt responses. """
+    index_file = os.path.join(record_dir, "index.jsonl")
+    if not os.path.exists(index_file):
+        return False
+    with open(index_file, "r") as file:
+        return any('/robots.txt"' in line for line in file)
+
+
+def main(config_file, record_dir, seeds):
+    cparser = ConfigParser()
+    cparser.read(config_file)
+    cparser["CONNECTION"]["RECORDMODE"] = "replay"
+    if seeds:
+        cparser["CRAWLER"]["SEEDURL"] = seeds
+    if record_dir:
+        cparser["CONNECTION"]["RECORDDIR"] = os.path.abspath(record_dir)
+    else:
+        record_dir = cparser["CONNECTION"].get("RECORDDIR", "recorded")
+        cparser["CONNECTION"]["RECORDDIR"] = os.path.abspath(
+            os.path.join(os.path.dirname(os.path.abspath(config_file)), record_dir))
+    # A crawl recorded without robots.txt (ROBOTS ENABLED = false) is
+    # replayed without it, instead of failing every robots.txt lookup.
+    if not has_robots(cparser["CONNECTION"]["RECORDDIR"]):
+        cparser["ROBOTS"]["ENABLED"] = "false"
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        # The scraper keeps its files in the working directory, import it
+        # only once there.
+        from utils.config import Config
+        from utils.metrics import metrics
+        from crawler import Crawler
+        config = Config(cparser)
+        config.time_delay = 0
+        start = time.perf_counter()
+        Crawler(config, True).start()
+        elapsed = time.perf_counter() - start
+        import scraper
+        # Write its files now, at exit the scratch directory is gone.
+        scraper.close()
+        atexit.unregister(scraper.close)
+
+        pages = sum(
+            value for (name, _), value in metrics.counters.items()
+            if name == "pages_total")
+        print(f"{pages} pages in {elapsed:.2f}s: {pages / elapsed:,.1f} pages/sec")
+        for stage, (count, total, longest) in sorted(
+                metrics.timings.items(), key=lambda item: -item[1][1]):
+            print(f"{stage:>16}: {total:8.3f}s total, "
+                  f"{total / count * 1000:8.3f}ms avg, {longest * 1000:8.3f}ms max")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--config_file", type=str, default=os.path.join(ROOT, "config.ini"))
+    parser.add_argument("--record_dir", type=str, default=None)
+    parser.add_argument("--seeds", type=str, default=None)
+    args = parser.parse_args()
+    main(os.path.abspath(args.config_file), args.record_dir, args.seeds)
@@ -0,0 +1,95 @@
+"""
+Tokens/sec of utils/tokenizer.py against the previous scraper.tokenizer
+loop (stopword set rebuilt per call, one dict update per token).
+
+    python benchmarks/tokenizer.py [--fixtures DIR] [--repeat 5]
+
+DIR holds saved html pages (*.html / *.htm). Without it synthetic text
+pages of increasing size are used.
+"""
+import glob
+import os
+import random
+import sys
+import time
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.page_parser import parse_page
+from utils.tokenizer import STOPWORDS, Tokenizer
+
+
+def legacy_tokenizer(words):
+    stopwords_set = set(STOPWORDS)
+    token_frequencies = {}
+    token_frequencies_no_stop_words = {}
+    for token in words:
+        token = token.lower()
+        if token not in token_frequencies:
+            token_frequencies[token] = 1
+        else:
+            token_frequencies[token] += 1
+        if token not in stopwords_set:
+            if token not in token_frequencies_no_stop_words:
+                token_frequencies_no_stop_words[token] = 1
+            else:
+                token_frequencies_no_stop_words[token] += 1
+    return token_frequencies, token_frequencies_no_stop_words
+
+
+def synthetic_pages():
+    rng = random.Random(121)
+    vocabulary = [f"word{i}" for i in range(5000)] + sorted(STOPWORDS)
+    punctuation = ["", "", "", ",", ".", ")", ":"]
+    pages = list()
+    for paragraphs in (10, 100, 1000):
+        body = "".join(
+            "<p>" + " ".join(
+                rng.choice(vocabulary).capitalize() + rng.choice(punctuation)
+                for _ in range(40)) + "</p>"
+            for _ in range(paragraphs))
+        pages.append((
+            f"synthetic-{paragraphs}",
+            f"<html><body>{body}</body></html>".encode("utf-8")))
+    return pages
+
+
+def fixture_pages(directory):
+    pages = list()
+    for path in sorted(glob.glob(os.path.join(directory, "*.htm*"))):
+        with open(path, "rb") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def tokens_per_sec(function, page, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        counts, _ = function(page)
+    elapsed = (time.perf_counter() - start) / repeat
+    return sum(counts.values()) / elapsed
+
+
+def main(fixtures, repeat):
+    pages = fixture_pages(fixtures) if fixtures else synthetic_pages()
+    paths = [
+        ("legacy", lambda page: legacy_tokenizer(page.words)),
+        ("whitespace", lambda page: Tokenizer(strip_punctuation=False).count(page.text)),
+        ("punctuation", lambda page: Tokenizer().count(page.text)),
+        ("no numbers", lambda page: Tokenizer(drop_numbers=True).count(page.text)),
+    ]
+    print(f"{'page':<24}{'tokens':>10}" + "".join(f"{name:>20}" for name, _ in paths))
+    for name, content in pages:
+        page = parse_page(content)
+        rates = [tokens_per_sec(function, page, repeat) for _, function in paths]
+        print(f"{name:<24}{len(page.words):>10}"
+              + "".join(f"{rate:>16,.0f} t/s" for rate in rates))
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--fixtures", type=str, default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.fixtures, args.repeat)
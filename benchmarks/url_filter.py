@@ -0,0 +1,89 @@
+"""
+URLs/sec of the compiled UrlFilter against the previous is_valid, on a
+synthetic link stream where links repeat across pages like they do in a
+crawl. Also checks that both agree on every url.
+
+    python benchmarks/url_filter.py [--urls 200000] [--unique 20000]
+"""
+import os
+import random
+import re
+import sys
+import time
+from argparse import ArgumentParser
+from urllib.parse import urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.url_filter import UrlFilter
+
+traps = ["/pdf/", "archive.ics.uci.edu", "Nanda", "timeline?", "version=", "action=login", "action=download", "ics.uci.edu/events", "isg.ics.uci.edu/events/tag/talks/day", "share=facebook", "share=twitter", ".pdf", ".ps"]
+
+
+def legacy_is_valid(url):
+    """ scraper.is_valid before the rules were compiled (minus logging). """
+    parsed = urlparse(url)
+    if parsed.scheme not in {"http", "https"}:
+        return False
+    if not parsed.hostname:
+        return False
+    if not re.match(r"(.*\.)?(ics|cs|informatics|stat)\.uci\.edu",
+                    parsed.hostname):
+        return False
+    if re.search(r"\b\d{4}-\d{2}-\d{2}\b", parsed.path):
+        return False
+    if any(keyword in parsed.query.lower() for keyword in
+           ["ical=", "outlook-ical=", "tribe-bar-date=", "eventdate=", "calendar-view", "date="]):
+        return False
+    for t in traps:
+        if t in parsed.geturl():
+            return False
+    return not re.match(
+        r".*\.(css|js|bmp|gif|jpe?g|ico|img|sql|ipynb|war|bam|mpg|ppsx"
+        + r"|png|tiff?|mid|mp2|mp3|mp4"
+        + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
+        + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
+        + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
+        + r"|epub|dll|cnf|tgz|sha1"
+        + r"|thmx|mso|arff|rtf|jar|csv"
+        + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower())
+
+
+def make_urls(count, unique):
+    rng = random.Random(121)
+    hosts = ["ics.uci.edu", "cs.uci.edu", "vision.ics.uci.edu", "wics.ics.uci.edu",
+             "stat.uci.edu", "www.google.com", "archive.ics.uci.edu"]
+    endings = ["", "/", ".html", ".pdf", ".PNG", ".tar.gz", "?share=twitter",
+               "?tribe-bar-date=2020-01", "?page=2", "/2019-02-03", "?Date=1",
+               "/timeline?x=1", "#frag"]
+    pool = [f"{rng.choice(['http', 'https'])}://{rng.choice(hosts)}/"
+            f"{'/'.join(str(rng.randint(0, 50)) for _ in range(rng.randint(1, 4)))}"
+            f"{rng.choice(endings)}" for _ in range(unique)]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def rate(function, urls):
+    start = time.perf_counter()
+    for url in urls:
+        function(url)
+    return len(urls) / (time.perf_counter() - start)
+
+
+def main(count, unique):
+    urls = make_urls(count, unique)
+    url_filter = UrlFilter()
+    mismatches = [url for url in set(urls) if url_filter.is_valid(url) != legacy_is_valid(url)]
+    print(f"{len(mismatches)} verdicts differ from the legacy is_valid")
+
+    url_filter = UrlFilter()
+    print(f"legacy is_valid:     {rate(legacy_is_valid, urls):12,.0f} urls/sec")
+    print(f"UrlFilter uncached:  {rate(url_filter._is_valid, urls):12,.0f} urls/sec")
+    print(f"UrlFilter (LRU):     {rate(url_filter.is_valid, urls):12,.0f} urls/sec")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--urls", type=int, default=200000)
+    parser.add_argument("--unique", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.urls, args.unique)
@@ -0,0 +1,108 @@
+"""
+Compares the frontier's "have we seen this url" check: a lookup in the
+shelve or SQLite save file against the Bloom filter and digest arrays of
+SeenStore. Each store is filled, closed and opened again as a resumed
+crawl would, then timed on a mix of mostly known urls (links back to pages
+already found) and one of mostly new urls (a crawl reaching new sites).
+Reports the time to open, the Python heap and the disk bytes per url, and
+lookups/sec.
+
+    python benchmarks/url_seen.py [--urls 20000]
+
+The request that added SeenStore targets crawls of millions of urls, run
+it with --urls 5000000 for those (several minutes and about 4 GB).
+"""
+import gc
+import os
+import shelve
+import sys
+import tempfile
+import time
+import tracemalloc
+from argparse import ArgumentParser
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from crawler.seen import SeenStore
+from crawler.store import SqliteStore
+from utils import get_urlhash
+
+
+def disk_size(path):
+    directory, name = os.path.split(path)
+    return sum(
+        os.path.getsize(os.path.join(directory, entry))
+        for entry in os.listdir(directory) if entry.startswith(name))
+
+
+def lookups_per_sec(store, mixes):
+    rates = list()
+    for probes in mixes.values():
+        start = time.perf_counter()
+        found = sum(1 for urlhash in probes if urlhash in store)
+        rates.append(f"{len(probes) / (time.perf_counter() - start):10,.0f} ({found} found)")
+    return ", ".join(f"{name} {rate}" for name, rate in zip(mixes, rates))
+
+
+def reopen(name, path, open_store, count, mixes):
+    """
+    Opens a filled store, timing that and its lookups, then opens it again
+    to measure the heap it takes (tracemalloc slows the open down).
+    """
+    gc.collect()
+    start = time.perf_counter()
+    store = open_store(path)
+    elapsed = time.perf_counter() - start
+    rates = lookups_per_sec(store, mixes)
+    if hasattr(store, "close"):
+        store.close()
+    del store
+    gc.collect()
+    tracemalloc.start()
+    store = open_store(path)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    if hasattr(store, "close"):
+        store.close()
+    print(f"{name:>9}: open {elapsed:6.2f}s, {memory / count:6.1f} bytes/url heap, "
+          f"{disk_size(path) / count:6.1f} bytes/url on disk")
+    print(f"{'':>9}  lookups/sec {rates}")
+
+
+def open_seen(path, count):
+    seen = SeenStore(path, capacity=count)
+    assert seen.load(count)
+    return seen
+
+
+def main(count):
+    known = [get_urlhash(f"https://www.ics.uci.edu/page/{i}") for i in range(count)]
+    new = [get_urlhash(f"https://www.ics.uci.edu/other/{i}") for i in range(count)]
+    mixes = {
+        "known-heavy": known + new[:count // 4],
+        "new-heavy": new + known[:count // 4],
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        for name, open_save in (("shelve", shelve.open), ("sqlite", SqliteStore)):
+            path = os.path.join(directory, f"bench-{name}")
+            save = open_save(path)
+            for urlhash in known:
+                save[urlhash] = ("https://www.ics.uci.edu/", False, 0)
+            save.close()
+            reopen(name, path, open_save, count, mixes)
+
+        path = os.path.join(directory, "bench.seen")
+        seen = SeenStore(path, capacity=count)
+        for urlhash in known:
+            seen.add(urlhash)
+        seen.save(count)
+        del seen
+        reopen("SeenStore", path, lambda path: open_seen(path, count), count, mixes)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("--urls", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.urls)
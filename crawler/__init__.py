@@ -1,19 +1,37 @@
 from utils import get_logger
+from utils.metrics import metrics
 from crawler.frontier import Frontier
-from crawler.worker import Worker
 
 class Crawler(object):
-    def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=Worker):
+    def __init__(self, config, restart, frontier_factory=Frontier, worker_factory=None):
+        # Imported here so that importing crawler.frontier does not load
+        # the scraper and build its stores.
+        import scraper
+        if worker_factory is None:
+            from crawler.worker import Worker as worker_factory
         self.config = config
         self.logger = get_logger("CRAWLER")
+        if config.metrics_port:
+            metrics.serve(config.metrics_port)
+        scraper.configure(config)
         self.frontier = frontier_factory(config, restart)
+        if hasattr(self.frontier, "record_page"):
+            scraper.add_page_listener(self.frontier.record_page)
+        if getattr(self.frontier, "robots", None) is not None:
+            scraper.set_robots(self.frontier.robots)
+        if hasattr(self.frontier, "check_content"):
+            scraper.set_content_check(self.frontier.check_content)
+        if hasattr(self.frontier, "add_sync_listener"):
+            self.frontier.add_sync_listener(scraper.flush)
         self.workers = list()
         self.worker_factory = worker_factory
 
     def start_async(self):
+        # A sharded frontier wants one worker (process) per shard.
+        count = getattr(self.frontier, "shard_count", self.config.threads_count)
         self.workers = [
             self.worker_factory(worker_id, self.config, self.frontier)
-            for worker_id in range(self.config.threads_count)]
+            for worker_id in range(count)]
         for worker in self.workers:
             worker.start()
 
@@ -22,5 +40,14 @@ class Crawler(object):
         self.join()
 
     def join(self):
-        for worker in self.workers:
-            worker.join()
+        # The metrics are written even when the crawl is interrupted.
+        try:
+            for worker in self.workers:
+                worker.join()
+            if hasattr(self.frontier, "close"):
+                self.frontier.close()
+            from utils.download import close_download
+            close_download()
+        finally:
+            metrics.dump(self.config.metrics_file)
+            metrics.close()
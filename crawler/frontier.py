@@ -1,18 +1,62 @@
 import os
-import shelve
+import time
 
-from threading import Thread, RLock
+from threading import Thread, RLock, Condition
 from queue import Queue, Empty
 
 from utils import get_logger, get_urlhash, normalize
-from scraper import is_valid
+from utils.metrics import metrics
+from crawler.links import LinkGraph
+from crawler.priority import LINK_SCORERS, get_scorer
+from crawler.rate import RateController
+from crawler.recrawl import RevisitPolicy, get_validators
+from crawler.robots import RobotsCache
+from crawler.scheduler import HostScheduler, get_host
+from crawler.seen import SeenStore
+from crawler.store import open_store, pending_urls, remove_store
+from crawler.traps import TrapDetector
 
 class Frontier(object):
     def __init__(self, config, restart):
         self.logger = get_logger("FRONTIER")
         self.config = config
-        self.to_be_downloaded = list()
-        
+        # Urls waiting to be downloaded, one priority queue per host.
+        self.to_be_downloaded = HostScheduler(self.config.time_delay)
+        # Links between discovered urls and their PageRank, see crawler/links.py.
+        self.links = None
+        if self.config.links_enabled or self.config.priority in LINK_SCORERS:
+            self.links = LinkGraph.from_config(self.config.save_file + ".links", self.config)
+        self.scorer = get_scorer(self.config.priority, self.links)
+        # The thread computing PageRank, while ranking is True.
+        self.ranking = False
+        self.rank_thread = None
+        # Number of urls handed out but not yet marked complete.
+        self.in_flight = 0
+        # Depth of the urls handed out, their links are one deeper.
+        self.in_progress = dict()
+        # Per host delays from observed latency and errors.
+        self.rate = RateController.from_config(self.config)
+        # Failed fetches per url that will be retried.
+        self.retries = dict()
+        # Guards all of the frontier's state. The scheduler, rate controller,
+        # trap detector and link graph have no locks of their own and are
+        # only used with it held.
+        self.lock = Condition(RLock())
+        self.traps = TrapDetector.from_config(self.config)
+        # robots.txt rules per site, fetched before a site's first url.
+        self.robots = None
+        if self.config.robots_enabled:
+            from utils.download import get_download
+            self.robots = RobotsCache.from_config(
+                get_download(self.config), self.config, self.logger)
+        # True while the pending urls of the save file are being queued.
+        self.loading = False
+        # When downloaded pages are due again, from how often they changed.
+        self.revisit = RevisitPolicy.from_config(self.config)
+        # Called before the save file is committed, see add_sync_listener.
+        self.sync_listeners = list()
+        metrics.add_collector(self._collect_metrics)
+
         if not os.path.exists(self.config.save_file) and not restart:
             # Save file does not exist, but request to load save.
             self.logger.info(
@@ -22,51 +66,299 @@ class Frontier(object):
             # Save file does exists, but request to start from seed.
             self.logger.info(
                 f"Found save file {self.config.save_file}, deleting it.")
-            os.remove(self.config.save_file)
+            remove_store(self.config.save_file)
+        if self.links is not None and not restart:
+            self.links.load()
         # Load existing save file, or create one if it does not exist.
-        self.save = shelve.open(self.config.save_file)
-        if restart:
+        self.save = open_store(self.config)
+        assert not self.config.recrawl or hasattr(self.save, "page_state"), \
+            "Re-crawls need SAVEBACKEND = sqlite"
+        # Digests of every url in the save file, checked before the save
+        # file itself when urls are added.
+        self.seen = SeenStore(self.config.save_file + ".seen")
+        self.save_count = len(self.save)
+        if restart or not self.seen.load(self.save_count):
+            self.seen.rebuild(self.save.keys())
+        if restart or not self.save_count:
             for url in self.config.seed_urls:
                 self.add_url(url)
         else:
             # Set the frontier state with contents of save file.
+            self._load_save_file()
+
+    def _load_save_file(self):
+        """
+        Queues the pending urls of the save file, and in a re-crawl the
+        downloaded urls due for a revisit as well. A save file that can read
+        them on its own connection (SQLite) is loaded in chunks from a
+        background thread, so workers start on the first chunk instead of
+        waiting for the whole file; others are loaded before returning.
+        """
+        if hasattr(self.save, "pending"):
+            self.loading = True
+            Thread(target=self._parse_save_file, daemon=True).start()
+        else:
             self._parse_save_file()
-            if not self.save:
-                for url in self.config.seed_urls:
-                    self.add_url(url)
 
     def _parse_save_file(self):
         ''' This function can be overridden for alternate saving techniques. '''
-        total_count = len(self.save)
+        from scraper import is_valid
         tbd_count = 0
-        for url, completed in self.save.values():
-            if not completed and is_valid(url):
-                self.to_be_downloaded.append(url)
-                tbd_count += 1
+        due_before = time.time() if self.config.recrawl else None
+        try:
+            for chunk in pending_urls(self.save, due_before=due_before):
+                # The filter rules may have changed since the urls were saved.
+                valid = [(url, depth) for url, depth in chunk if is_valid(url)]
+                with self.lock:
+                    for url, depth in valid:
+                        self._queue(url, depth)
+                    self.lock.notify_all()
+                tbd_count += len(valid)
+        finally:
+            with self.lock:
+                self.loading = False
+                self.lock.notify_all()
         self.logger.info(
-            f"Found {tbd_count} urls to be downloaded from {total_count} "
+            f"Found {tbd_count} urls to be downloaded from {self.save_count} "
             f"total urls discovered.")
 
     def get_tbd_url(self):
-        try:
-            return self.to_be_downloaded.pop()
-        except IndexError:
-            return None
+        """
+        Blocks until a url whose host is past its politeness delay is
+        available and robots.txt allows it. Returns None only when every
+        queue is empty and no url is still being downloaded, since those
+        may add more urls.
+        """
+        while True:
+            url = self._wait_for_url()
+            if url is None or self._allowed_by_robots(url):
+                return url
+
+    def _wait_for_url(self):
+        with self.lock:
+            while True:
+                url, wait = self._pop_ready()
+                if url:
+                    return url
+                if wait is None and self.in_flight == 0 and not self.loading:
+                    # Wake the other workers so they can stop as well.
+                    self.lock.notify_all()
+                    return None
+                self.lock.wait(wait)
+
+    def _pop_ready(self):
+        """
+        Hands out a url whose host may be fetched now, as (url, None), or
+        returns (None, seconds until a host is ready or None if all queues
+        are empty). Must be called with self.lock held.
+        """
+        while True:
+            url, depth, wait = self.to_be_downloaded.pop(time.monotonic())
+            if url and not self.traps.allow_fetch(url):
+                # Its template was blocked after the url was queued.
+                self.save[get_urlhash(url)] = (url, True, depth)
+                self.to_be_downloaded.release(get_host(url), time.monotonic(), 0)
+                continue
+            if url:
+                self.in_flight += 1
+                self.in_progress[url] = depth
+                return url, None
+            # Nothing to hand out right now, commit any batched writes.
+            self._sync()
+            return None, wait
 
-    def add_url(self, url):
+    def _allowed_by_robots(self, url):
+        """
+        Checks a handed out url against its site's robots.txt, fetching the
+        file (and queueing the urls of its sitemaps) the first time, without
+        holding the lock. A disallowed url is marked complete.
+        """
+        if self.robots is None:
+            return True
+        from scraper import is_valid
+        rules, fetched = self.robots.rules(url)
+        if fetched and rules.sitemaps and self.config.sitemap_max_urls:
+            for sitemap_url in self.robots.sitemap_urls(
+                    rules.sitemaps, self.config.sitemap_max_urls):
+                if is_valid(sitemap_url):
+                    self.add_url(sitemap_url)
+        if self.robots.allowed(url, fetch=False):
+            return True
+        self.logger.info(f"Disallowed by robots.txt: {url}")
+        metrics.inc("robots_disallowed_total")
+        self.mark_url_complete(url)
+        return False
+
+    def _score(self, url, depth):
+        """ Score of a url, raised by RETRYPENALTY for each of its retries. """
+        host_fetched = self.to_be_downloaded.fetched[get_host(url)]
+        penalty = self.retries.get(url, 0) * self.config.rate_retry_penalty
+        return self.scorer(url, depth, host_fetched) + penalty
+
+    def _queue(self, url, depth):
+        self.to_be_downloaded.push(url, self._score(url, depth), depth)
+
+    def _depth(self, parent):
+        """ Depth of a link found on parent; seeds (no parent) are 0. """
+        with self.lock:
+            return self.in_progress.get(parent, -1) + 1
+
+    def add_url(self, url, parent=None):
         url = normalize(url)
+        if parent is not None:
+            self._add_link(parent, url)
+        self._add(url, self._depth(parent))
+
+    def _add_link(self, parent, url):
+        """
+        Records the link in the link graph, and every RANKEVERY links
+        starts a background thread ranking the graph, unless one is running.
+        """
+        if self.links is None:
+            return
+        with self.lock:
+            self.links.add_link(parent, url)
+            if self.links.pending >= self.config.links_rank_every and not self.ranking:
+                self.ranking = True
+                self.rank_thread = Thread(
+                    target=self._rank, args=(self.links.take_links(),), daemon=True)
+                self.rank_thread.start()
+
+    def _rank(self, batch):
+        """
+        Merges a batch of links into the graph and computes its PageRank
+        without holding the lock, then rescores the queued urls if the
+        crawl order depends on it. The lock is taken once per host while
+        rescoring, so workers are not held up for the whole queue.
+        """
+        try:
+            start = time.perf_counter()
+            with metrics.timer("pagerank"):
+                ranks = self.links.rank(batch)
+            with self.lock:
+                self.links.set_ranks(ranks)
+                hosts = list()
+                if self.config.priority in LINK_SCORERS:
+                    hosts = list(self.to_be_downloaded.queues)
+            for host in hosts:
+                with self.lock:
+                    self.to_be_downloaded.rescore(host, self._score)
+            if hosts:
+                with self.lock:
+                    self.lock.notify_all()
+            self.logger.info(
+                f"Ranked {len(ranks)} pages with {len(self.links.sources)} links "
+                f"in {time.perf_counter() - start:.2f}s.")
+        finally:
+            with self.lock:
+                self.ranking = False
+
+    def _add(self, url, depth):
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            self.save[urlhash] = (url, False)
-            self.save.sync()
-            self.to_be_downloaded.append(url)
+        with self.lock:
+            if urlhash not in self.seen and self.traps.allow(url):
+                self.seen.add(urlhash)
+                self.save[urlhash] = (url, False, depth)
+                self._sync()
+                self._queue(url, depth)
+                self.lock.notify()
     
-    def mark_url_complete(self, url):
+    def mark_url_complete(self, url, status=None, latency=None):
+        """
+        Marks a handed out url as done. Workers pass the response status
+        (None if the download raised) and the download time, which set the
+        host's next delay. A url whose fetch failed (see crawler/rate.py)
+        is queued again, behind the host's other urls, up to MAXRETRIES
+        times.
+        """
+        urlhash = get_urlhash(url)
+        host = get_host(url)
+        with self.lock:
+            if urlhash not in self.seen:
+                # This should not happen.
+                self.logger.error(
+                    f"Completed url {url}, but have not seen it before.")
+
+            depth = self.in_progress.pop(url, 0)
+            failed = latency is not None and self.rate.record(host, status, latency)
+            retries = self.retries.pop(url, 0)
+            if failed and retries < self.config.rate_max_retries:
+                self.retries[url] = retries + 1
+                self._queue(url, depth)
+                metrics.inc("retries_total")
+            else:
+                self.save[urlhash] = (url, True, depth)
+                self._sync()
+            self.in_flight -= 1
+            crawl_delay = self.robots.crawl_delay(url) if self.robots else None
+            self.to_be_downloaded.release(
+                host, time.monotonic(), self.rate.delay(host, crawl_delay))
+            self.lock.notify_all()
+
+    def check_content(self, url, headers, digest):
+        """
+        Compares a downloaded page, given its headers and content_hash, with
+        its last download and records its validators, content hash and next
+        revisit time. Returns "new",
+        "changed" or "unchanged" (see crawler/recrawl.py); always "new"
+        with a save file that keeps no page states.
+        """
+        if not hasattr(self.save, "page_state"):
+            return "new"
+        etag, last_modified = get_validators(headers)
         urlhash = get_urlhash(url)
-        if urlhash not in self.save:
-            # This should not happen.
-            self.logger.error(
-                f"Completed url {url}, but have not seen it before.")
+        with self.lock:
+            state, result = self.revisit.check(
+                self.save.page_state(urlhash), etag, last_modified, digest, time.time())
+            self.save.set_page_state(urlhash, state)
+        metrics.inc("content_checks_total", result=result)
+        return result
+
+    def add_sync_listener(self, listener):
+        """
+        Calls listener() before every commit of the save file, so state kept
+        for the downloaded pages (e.g. the scraper's buffered token counts)
+        is on disk before their urls are recorded complete.
+        """
+        self.sync_listeners.append(listener)
+
+    def _sync(self):
+        with metrics.timer("frontier_sync"):
+            # A shelve writes through on every sync.
+            if not hasattr(self.save, "commit_due") or self.save.commit_due():
+                for listener in self.sync_listeners:
+                    listener()
+            self.save.sync()
+
+    def _collect_metrics(self):
+        with self.lock:
+            yield "frontier_size", {}, len(self.to_be_downloaded)
+            yield "frontier_in_flight", {}, self.in_flight
+            yield "frontier_seen_urls", {}, len(self.seen)
+            if self.links is not None:
+                yield "link_graph_nodes", {}, len(self.links)
+                yield "link_graph_edges", {}, self.links.edge_count
+            for host, queue in self.to_be_downloaded.queues.items():
+                yield "host_queue_depth", {"host": host}, len(queue)
+            for host, stats in self.rate.hosts.items():
+                yield "host_latency_seconds", {"host": host}, round(stats.latency, 6)
+                yield "host_error_rate", {"host": host}, round(stats.error_rate, 4)
+                yield "host_delay_seconds", {"host": host}, self.rate.delay(host)
+
+    def record_page(self, url, kind):
+        """ Feeds the outcome of a scraped page to the trap detector. """
+        with self.lock:
+            self.traps.record_page(url, kind)
 
-        self.save[urlhash] = (url, True)
-        self.save.sync()
+    def close(self):
+        if self.rank_thread is not None:
+            self.rank_thread.join()
+        with self.lock:
+            for listener in self.sync_listeners:
+                listener()
+            save_count = len(self.save)
+            self.save.close()
+            self.seen.save(save_count)
+            if self.links is not None:
+                self.links.save()
+            self.traps.export(self.config.trap_export_file)
@@ -0,0 +1,279 @@
+import math
+import os
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from crawler.seen import get_digest
+from utils import get_urlhash
+
+LINKS_FORMAT = 0x4c494e4b00000001
+
+
+def merge_links(row_ptr, sources, node_count, new_sources, new_targets):
+    """
+    Adds the edges new_sources[i] -> new_targets[i] to the in-link CSR
+    (row_ptr, sources) and returns the new (row_ptr, sources), sized for
+    node_count nodes. Edges keep their order within a target.
+    """
+    if numpy is not None:
+        return _merge_numpy(row_ptr, sources, node_count, new_sources, new_targets)
+    return _merge_python(row_ptr, sources, node_count, new_sources, new_targets)
+
+
+def _merge_python(row_ptr, sources, node_count, new_sources, new_targets):
+    old_count = len(row_ptr) - 1
+    added = array("I", bytes(4 * node_count))
+    for target in new_targets:
+        added[target] += 1
+    merged_ptr = array("Q", bytes(8 * (node_count + 1)))
+    total = 0
+    for node in range(node_count):
+        merged_ptr[node] = total
+        total += added[node]
+        if node < old_count:
+            total += row_ptr[node + 1] - row_ptr[node]
+    merged_ptr[node_count] = total
+    merged = array("I", bytes(4 * total))
+    # Old in-links first, then the new ones behind them.
+    cursor = array("Q", merged_ptr)
+    for node in range(old_count):
+        start, end = row_ptr[node], row_ptr[node + 1]
+        if start != end:
+            merged[cursor[node]:cursor[node] + end - start] = sources[start:end]
+            cursor[node] += end - start
+    for source, target in zip(new_sources, new_targets):
+        merged[cursor[target]] = source
+        cursor[target] += 1
+    return merged_ptr, merged
+
+
+def _merge_numpy(row_ptr, sources, node_count, new_sources, new_targets):
+    old_ptr = numpy.frombuffer(row_ptr, dtype=numpy.int64)
+    old_targets = numpy.repeat(
+        numpy.arange(len(old_ptr) - 1, dtype=numpy.uint32), numpy.diff(old_ptr))
+    targets = numpy.concatenate(
+        (old_targets, numpy.frombuffer(new_targets, dtype=numpy.uint32)))
+    all_sources = numpy.concatenate((
+        numpy.frombuffer(sources, dtype=numpy.uint32),
+        numpy.frombuffer(new_sources, dtype=numpy.uint32)))
+    order = numpy.argsort(targets, kind="stable")
+    counts = numpy.bincount(targets, minlength=node_count)
+    merged_ptr = array("Q", [0])
+    merged_ptr.frombytes(numpy.cumsum(counts, dtype=numpy.int64).tobytes())
+    merged = array("I")
+    merged.frombytes(all_sources[order].tobytes())
+    return merged_ptr, merged
+
+
+def pagerank(row_ptr, sources, out_degree, damping=0.85, iterations=30, tolerance=1e-6):
+    """
+    PageRank of the graph given by its in-link CSR and out-degrees, by
+    power iteration until the ranks move less than tolerance per node.
+    Pages without outlinks spread their rank over all pages. The ranks are
+    scaled to an average of 1.0 and returned as an array of doubles.
+    """
+    if numpy is not None:
+        return _pagerank_numpy(row_ptr, sources, out_degree, damping, iterations, tolerance)
+    return _pagerank_python(row_ptr, sources, out_degree, damping, iterations, tolerance)
+
+
+def _pagerank_python(row_ptr, sources, out_degree, damping, iterations, tolerance):
+    count = len(out_degree)
+    ranks = array("d", [1.0]) * count
+    for _ in range(iterations):
+        share = [
+            rank / degree if degree else 0.0 for rank, degree in zip(ranks, out_degree)]
+        dangling = sum(rank for rank, degree in zip(ranks, out_degree) if not degree)
+        teleport = (1 - damping) + damping * dangling / count
+        get_share = share.__getitem__
+        new_ranks = array("d", [
+            teleport + damping * sum(map(get_share, sources[row_ptr[node]:row_ptr[node + 1]]))
+            for node in range(count)])
+        delta = sum(abs(new - old) for new, old in zip(new_ranks, ranks))
+        ranks = new_ranks
+        if delta < tolerance * count:
+            break
+    return ranks
+
+
+def _pagerank_numpy(row_ptr, sources, out_degree, damping, iterations, tolerance):
+    count = len(out_degree)
+    ptr = numpy.frombuffer(row_ptr, dtype=numpy.int64)
+    targets = numpy.repeat(numpy.arange(count), numpy.diff(ptr))
+    edge_sources = numpy.frombuffer(sources, dtype=numpy.uint32)
+    degrees = numpy.frombuffer(out_degree, dtype=numpy.uint32).astype(numpy.float64)
+    dangling = degrees == 0
+    ranks = numpy.ones(count)
+    for _ in range(iterations):
+        share = numpy.divide(ranks, degrees, out=numpy.zeros(count), where=~dangling)
+        teleport = (1 - damping) + damping * ranks[dangling].sum() / count
+        new_ranks = teleport + damping * numpy.bincount(
+            targets, weights=share[edge_sources], minlength=count)
+        delta = numpy.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if delta < tolerance * count:
+            break
+    result = array("d")
+    result.frombytes(ranks.tobytes())
+    return result
+
+
+class LinkGraph(object):
+    """
+    The links between discovered urls, for ranking them by link analysis.
+
+    Urls get integer ids in the order they are first seen, keyed by their
+    8 byte digest (crawler/seen.py). New links are appended to a pair of
+    source/target id arrays; rank() merges them into a compressed sparse
+    row layout of in-links, where sources[row_ptr[v]:row_ptr[v + 1]] are
+    the pages linking to v. That is 4 bytes per link and about 24 per page
+    plus the digest index. In- and out-degrees are counted as links arrive.
+
+    PageRank is computed in batches over the merged graph (numpy when it is
+    installed, else pure Python), outside the frontier's lock: take_links()
+    and set_ranks() are the only steps that need it. importance() turns a
+    page's rank into a priority bonus. The graph is written to `path` by
+    save() and read back by load() when a crawl is resumed.
+    """
+    def __init__(self, path, damping=0.85, iterations=30, tolerance=1e-6):
+        self.path = path
+        self.damping = damping
+        self.iterations = iterations
+        self.tolerance = tolerance
+        self.ids = dict()
+        self.digests = array("Q")
+        self.in_degree = array("I")
+        self.out_degree = array("I")
+        self.row_ptr = array("Q", [0])
+        self.sources = array("I")
+        self.new_sources = array("I")
+        self.new_targets = array("I")
+        self.edge_count = 0
+        # PageRank of the first len(ranks) pages, average 1.0.
+        self.ranks = array("d")
+
+    @classmethod
+    def from_config(cls, path, config):
+        return cls(path, config.links_damping, config.links_iterations)
+
+    def __len__(self):
+        return len(self.digests)
+
+    @property
+    def pending(self):
+        """ Links added since the last take_links(). """
+        return len(self.new_sources)
+
+    def _node(self, url):
+        digest = get_digest(get_urlhash(url))
+        node = self.ids.get(digest)
+        if node is None:
+            node = self.ids[digest] = len(self.digests)
+            self.digests.append(digest)
+            self.in_degree.append(0)
+            self.out_degree.append(0)
+        return node
+
+    def add_link(self, source_url, target_url):
+        source = self._node(source_url)
+        target = self._node(target_url)
+        self.new_sources.append(source)
+        self.new_targets.append(target)
+        self.out_degree[source] += 1
+        self.in_degree[target] += 1
+        self.edge_count += 1
+
+    def take_links(self):
+        """
+        Returns the links added since the last call as a batch for rank(),
+        with the node count and out-degrees at this point.
+        """
+        batch = (len(self.digests), self.new_sources, self.new_targets,
+                 array("I", self.out_degree))
+        self.new_sources = array("I")
+        self.new_targets = array("I")
+        return batch
+
+    def rank(self, batch):
+        """
+        Merges a batch from take_links() into the CSR arrays and returns
+        the PageRank of every page in it. Runs without the frontier's lock,
+        one batch at a time.
+        """
+        node_count, new_sources, new_targets, out_degree = batch
+        self.row_ptr, self.sources = merge_links(
+            self.row_ptr, self.sources, node_count, new_sources, new_targets)
+        if not node_count:
+            return array("d")
+        return pagerank(
+            self.row_ptr, self.sources, out_degree, self.damping, self.iterations,
+            self.tolerance)
+
+    def set_ranks(self, ranks):
+        self.ranks = ranks
+
+    def in_links(self, url):
+        node = self.ids.get(get_digest(get_urlhash(url)))
+        return 0 if node is None else self.in_degree[node]
+
+    def importance(self, url):
+        """
+        log2 of the url's PageRank relative to the average page: 1.0 for a
+        page ranked twice the average, negative below it. Pages discovered
+        after the last ranking are estimated from their in-degree so far;
+        urls without links are 0.
+        """
+        node = self.ids.get(get_digest(get_urlhash(url)))
+        if node is None:
+            return 0.0
+        if node < len(self.ranks):
+            return math.log2(self.ranks[node])
+        return math.log2((1 - self.damping) + self.damping * self.in_degree[node])
+
+    def load(self):
+        """ Reads the graph saved by save(); False if there is none. """
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "rb") as file:
+            header = array("Q")
+            try:
+                header.fromfile(file, 4)
+            except EOFError:
+                return False
+            magic, node_count, edge_count, ranked = header
+            if magic != LINKS_FORMAT:
+                return False
+            self.digests = array("Q")
+            self.digests.fromfile(file, node_count)
+            self.in_degree = array("I")
+            self.in_degree.fromfile(file, node_count)
+            self.out_degree = array("I")
+            self.out_degree.fromfile(file, node_count)
+            self.row_ptr = array("Q")
+            self.row_ptr.fromfile(file, node_count + 1)
+            self.sources = array("I")
+            self.sources.fromfile(file, edge_count)
+            self.ranks = array("d")
+            self.ranks.fromfile(file, ranked)
+        self.ids = {digest: node for node, digest in enumerate(self.digests)}
+        self.new_sources = array("I")
+        self.new_targets = array("I")
+        self.edge_count = edge_count
+        return True
+
+    def save(self):
+        """ Merges the pending links and writes the graph to path. """
+        self.row_ptr, self.sources = merge_links(
+            self.row_ptr, self.sources, len(self.digests), *self.take_links()[1:3])
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as file:
+            array("Q", [
+                LINKS_FORMAT, len(self.digests), len(self.sources), len(self.ranks)]).tofile(file)
+            for values in (self.digests, self.in_degree, self.out_degree,
+                           self.row_ptr, self.sources, self.ranks):
+                values.tofile(file)
+        os.replace(tmp_path, self.path)
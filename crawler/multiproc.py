@@ -0,0 +1,216 @@
+import os
+import time
+import zlib
+from multiprocessing import Process, Queue, Value, Array, Lock
+from queue import Empty
+
+from utils import get_logger, normalize
+from utils.metrics import metrics
+from crawler.frontier import Frontier
+from crawler.scheduler import get_host
+
+SHARD_FILES = ("page_fingerprints.txt", "blocked_patterns.txt")
+PAGE_RECORDS = "page_records.bin"
+
+
+def shard_of(url, shard_count):
+    """ Owning shard of a url: a stable hash of its host. """
+    return zlib.crc32(get_host(url).encode("utf-8")) % shard_count
+
+
+class ShardRouter(object):
+    """
+    Frontier factory for the process based crawl mode.
+
+    Holds what the shard processes share: one inbox queue per shard, a
+    count of urls in transit between shards and an idle flag per shard.
+    Each ShardProcess builds its own ShardFrontier from it. The crawl is
+    over once every shard is idle and no url is in transit; both are only
+    changed under one lock, so that state cannot be observed halfway.
+    close() merges the per-shard statistics once the processes have ended.
+    """
+    def __init__(self, config, restart):
+        self.config = config
+        self.restart = restart
+        self.shard_count = config.process_count
+        self.inboxes = [Queue() for _ in range(self.shard_count)]
+        self.in_transit = Value("i", 0, lock=False)
+        self.idle = Array("b", self.shard_count, lock=False)
+        self.lock = Lock()
+
+    def shard_dir(self, shard_id):
+        return os.path.abspath(os.path.join(self.config.shard_dir, f"shard-{shard_id}"))
+
+    def owner(self, url):
+        return shard_of(url, self.shard_count)
+
+    def send(self, shard_id, item):
+        with self.lock:
+            self.in_transit.value += 1
+        self.inboxes[shard_id].put(item)
+
+    def received(self, shard_id):
+        with self.lock:
+            self.idle[shard_id] = 0
+            self.in_transit.value -= 1
+
+    def finished(self, shard_id):
+        """ Marks the shard idle and says whether the whole crawl is done. """
+        with self.lock:
+            self.idle[shard_id] = 1
+            return self.in_transit.value == 0 and all(self.idle)
+
+    def close(self):
+        merge_shards(
+            [self.shard_dir(shard_id) for shard_id in range(self.shard_count)],
+            self.config.shard_dir)
+
+
+class ShardFrontier(Frontier):
+    """
+    Frontier of one shard: keeps the urls of the hosts this shard owns and
+    sends every other url to its owner's inbox.
+    """
+    def __init__(self, config, restart, router, shard_id):
+        self.router = router
+        self.shard_id = shard_id
+        super().__init__(config, restart)
+
+    def add_url(self, url, parent=None):
+        url = normalize(url)
+        if parent is not None:
+            self._add_link(parent, url)
+        depth = self._depth(parent)
+        owner = self.router.owner(url)
+        if owner == self.shard_id:
+            self._add(url, depth)
+        else:
+            self.router.send(owner, (url, depth))
+
+    def _receive(self):
+        inbox = self.router.inboxes[self.shard_id]
+        while True:
+            try:
+                url, depth = inbox.get_nowait()
+            except Empty:
+                return
+            with self.lock:
+                self._add(url, depth)
+                self.router.received(self.shard_id)
+
+    def _wait_for_url(self):
+        """
+        Like Frontier._wait_for_url, but an empty shard only stops once
+        every other shard is idle too, since they may still send it urls.
+        """
+        while True:
+            self._receive()
+            with self.lock:
+                url, wait = self._pop_ready()
+                if url:
+                    return url
+                if (wait is None and self.in_flight == 0 and not self.loading
+                        and self.router.finished(self.shard_id)):
+                    self.lock.notify_all()
+                    return None
+                self.lock.wait(0.1 if wait is None else min(wait, 0.1))
+
+
+class ShardProcess(Process):
+    """
+    Worker factory for the process based crawl mode: one process per
+    shard, each running THREADCOUNT Worker threads on its own frontier,
+    token totals, visited index and report in its shard directory.
+    """
+    def __init__(self, worker_id, config, frontier):
+        self.shard_id = worker_id
+        self.config = config
+        self.router = frontier
+        super().__init__(daemon=False)
+
+    def run(self):
+        shard_dir = self.router.shard_dir(self.shard_id)
+        os.makedirs(shard_dir, exist_ok=True)
+        # The scraper and frontier keep their files in the working directory.
+        os.chdir(shard_dir)
+
+        import scraper
+        from crawler.worker import Worker
+        logger = get_logger(f"Shard-{self.shard_id}", "Shard")
+        scraper.configure(self.config)
+        frontier = ShardFrontier(
+            self.config, self.router.restart, self.router, self.shard_id)
+        scraper.add_page_listener(frontier.record_page)
+        scraper.set_robots(frontier.robots)
+        scraper.set_content_check(frontier.check_content)
+        frontier.add_sync_listener(scraper.flush)
+        if self.config.metrics_port:
+            # The crawler process serves METRICSPORT, shard n the port after n.
+            metrics.serve(self.config.metrics_port + 1 + self.shard_id)
+        workers = [
+            Worker(f"{self.shard_id}.{worker_id}", self.config, frontier)
+            for worker_id in range(self.config.threads_count)]
+        start = time.monotonic()
+        try:
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            frontier.close()
+            scraper.close()
+        finally:
+            metrics.dump(self.config.metrics_file)
+            metrics.close()
+        logger.info(
+            f"Shard {self.shard_id} done in {time.monotonic() - start:.0f}s.")
+
+
+def merge_shards(shard_dirs, output_dir):
+    """
+    Combines the statistics of finished shards in output_dir: the
+    fingerprint and blocked pattern files are concatenated, the page
+    records copied into one store, the token totals summed and the report
+    rebuilt from the merged files.
+    """
+    from utils.page_store import PageStore
+    from utils.report import load_report
+    from utils.token_store import TokenAggregator
+
+    os.makedirs(output_dir, exist_ok=True)
+    for name in SHARD_FILES:
+        with open(os.path.join(output_dir, name), "w") as merged:
+            for shard_dir in shard_dirs:
+                path = os.path.join(shard_dir, name)
+                if os.path.exists(path):
+                    with open(path, "r") as file:
+                        for line in file:
+                            merged.write(line)
+
+    pages_path = os.path.join(output_dir, PAGE_RECORDS)
+    if os.path.exists(pages_path):
+        os.remove(pages_path)
+    # Host ids differ between shards, the records are added again.
+    pages = PageStore(pages_path, flush_pages=10000)
+    for shard_dir in shard_dirs:
+        for record in PageStore(os.path.join(shard_dir, PAGE_RECORDS)).records():
+            pages.add(
+                record.url, record.words, record.words_nostop, record.content_hash,
+                record.status, record.fetched_at)
+    pages.flush()
+
+    totals = TokenAggregator(
+        os.path.join(output_dir, "token_frequencies.checkpoint.json"),
+        os.path.join(output_dir, "token_frequencies.log"))
+    for name in ("token_frequencies.checkpoint.json", "token_frequencies.log"):
+        # Start from empty totals, the shards hold everything.
+        path = os.path.join(output_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+    for shard_dir in shard_dirs:
+        shard = TokenAggregator(
+            os.path.join(shard_dir, "token_frequencies.checkpoint.json"),
+            os.path.join(shard_dir, "token_frequencies.log"))
+        totals.add_page(
+            dict(shard.most_common(None, True)), dict(shard.most_common(None)))
+    totals.checkpoint()
+    load_report(pages, totals).write(os.path.join(output_dir, "report.txt"))
@@ -0,0 +1,55 @@
+"""
+Scoring functions for the frontier's priority queues. Each takes the url,
+its link depth from the seeds and the number of urls already fetched from
+its host, and returns a score; lower scores are crawled first.
+
+Link scorers also get the url's importance from the link graph (see
+LinkGraph.importance in crawler/links.py).
+"""
+
+
+def depth_score(url, depth, host_fetched):
+    """ Breadth first: shallow pages before deep ones. """
+    return depth
+
+
+def fairness_score(url, depth, host_fetched):
+    """ Hosts that got few fetches so far go first. """
+    return host_fetched
+
+
+def balanced_score(url, depth, host_fetched):
+    """
+    Breadth first, but a host's pages sink as it gets crawled, so new
+    subdomains are reached early instead of one deep site being exhausted.
+    """
+    return depth + host_fetched / 50
+
+
+def link_score(url, depth, host_fetched, importance):
+    """
+    Like balanced, but pages with a high PageRank move up by log2 of their
+    rank relative to the average page, low ranked ones sink.
+    """
+    return balanced_score(url, depth, host_fetched) - importance
+
+
+SCORERS = {
+    "depth": depth_score,
+    "fairness": fairness_score,
+    "balanced": balanced_score,
+}
+
+
+LINK_SCORERS = {
+    "links": link_score,
+}
+
+
+def get_scorer(name, links=None):
+    if name in LINK_SCORERS:
+        assert links is not None, f"PRIORITY = {name} needs [LINKS] ENABLED"
+        score = LINK_SCORERS[name]
+        return lambda url, depth, host_fetched: score(
+            url, depth, host_fetched, links.importance(url))
+    return SCORERS[name]
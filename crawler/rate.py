@@ -0,0 +1,78 @@
+class HostStats(object):
+    __slots__ = ("latency", "error_rate", "failures", "fetches")
+
+    def __init__(self):
+        self.latency = None
+        self.error_rate = 0.0
+        # Consecutive failed fetches, reset by a successful one.
+        self.failures = 0
+        self.fetches = 0
+
+
+def is_failure(status):
+    """
+    Whether a fetch says the host (or the cache server) is struggling: no
+    response at all (timeout, connection error) or a 5xx/6xx status.
+    4xx statuses are answers about the page, not the host.
+    """
+    return status is None or status >= 500
+
+
+class RateController(object):
+    """
+    Adapts the delay between fetches to a host to how the host responds.
+
+    Each fetch updates the host's exponentially weighted moving averages
+    (weight `alpha`) of latency and error rate. The delay before the
+    host's next fetch is the longest of:
+        the POLITENESS floor `floor`,
+        `latency_factor` times the average latency, so slow hosts get
+        proportionally more time between requests,
+        the site's robots.txt Crawl-delay if any,
+        after n consecutive failures, `backoff_base` * 2 ** (n - 1)
+        seconds, capped at `max_backoff`.
+    """
+    def __init__(self, floor, alpha=0.3, latency_factor=2.0, backoff_base=1.0,
+                 max_backoff=300.0):
+        self.floor = floor
+        self.alpha = alpha
+        self.latency_factor = latency_factor
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.hosts = dict()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.time_delay, config.rate_alpha, config.rate_latency_factor,
+            config.rate_backoff_base, config.rate_max_backoff)
+
+    def record(self, host, status, latency):
+        """ Records one fetch from host; returns whether it failed. """
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = HostStats()
+        failed = is_failure(status)
+        stats.fetches += 1
+        if stats.latency is None:
+            stats.latency = latency
+        else:
+            stats.latency += self.alpha * (latency - stats.latency)
+        stats.error_rate += self.alpha * (failed - stats.error_rate)
+        stats.failures = stats.failures + 1 if failed else 0
+        return failed
+
+    def delay(self, host, crawl_delay=None):
+        """ Seconds to wait before the next fetch from host. """
+        delay = self.floor
+        if crawl_delay:
+            delay = max(delay, crawl_delay)
+        stats = self.hosts.get(host)
+        if stats is None:
+            return delay
+        if stats.latency is not None:
+            delay = max(delay, self.latency_factor * stats.latency)
+        if stats.failures:
+            delay = max(delay, min(
+                self.max_backoff, self.backoff_base * 2 ** (stats.failures - 1)))
+        return delay
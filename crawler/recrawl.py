@@ -0,0 +1,98 @@
+import math
+
+
+def get_validators(headers):
+    """ (ETag, Last-Modified) of a response, None where missing. """
+    return headers.get("ETag") or None, headers.get("Last-Modified") or None
+
+
+class PageState(object):
+    """
+    What the frontier remembers about a downloaded page: its validators and
+    content hash from the last check, when it was first and last checked,
+    how many times it was checked again and how many of those found it
+    changed, and when it should be revisited. Times are unix timestamps.
+    """
+    __slots__ = (
+        "etag", "last_modified", "content_hash", "first_checked",
+        "checked_at", "revisit_at", "checks", "changes")
+
+    def __init__(self, etag=None, last_modified=None, content_hash=None,
+                 first_checked=None, checked_at=None, revisit_at=None,
+                 checks=0, changes=0):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.first_checked = first_checked
+        self.checked_at = checked_at
+        self.revisit_at = revisit_at
+        self.checks = checks
+        self.changes = changes
+
+    def unchanged(self, etag, last_modified, digest):
+        """
+        Whether a new download is the same page: the server sent the same
+        ETag or Last-Modified, or the body hashes the same.
+        """
+        if etag and etag == self.etag:
+            return True
+        if last_modified and last_modified == self.last_modified:
+            return True
+        return digest == self.content_hash
+
+
+class RevisitPolicy(object):
+    """
+    Picks when a page is due again from how often it changed.
+
+    After n checks that found X changes, at a mean interval I, the page's
+    change rate is estimated as -ln((n - X + 0.5) / (n + 0.5)) / I (the
+    estimator of Cho and Garcia-Molina, which stays finite when every check
+    found a change) and the next interval is its inverse: pages that always
+    change are revisited sooner than I, pages that never do later. The
+    interval at most doubles per check and stays within
+    [`min_interval`, `max_interval`] seconds; a page seen once waits
+    `initial` seconds.
+    """
+    def __init__(self, initial=86400.0, min_interval=3600.0, max_interval=2592000.0):
+        self.initial = initial
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.recrawl_initial, config.recrawl_min_interval,
+            config.recrawl_max_interval)
+
+    def interval(self, state):
+        """ Seconds from state.checked_at until the page is due again. """
+        if not state.checks:
+            return self.initial
+        mean = (state.checked_at - state.first_checked) / state.checks
+        if mean <= 0:
+            return self.initial
+        rate = -math.log((state.checks - state.changes + 0.5) / (state.checks + 0.5)) / mean
+        interval = min(1 / rate, 2 * mean) if rate > 0 else 2 * mean
+        return max(self.min_interval, min(self.max_interval, interval))
+
+    def check(self, state, etag, last_modified, digest, now):
+        """
+        Records a download of the page at time now in state (None for a
+        page without one) and returns (state, result), result being "new",
+        "changed" or "unchanged".
+        """
+        if state is None or state.content_hash is None:
+            state = PageState(first_checked=now)
+            result = "new"
+        else:
+            changed = not state.unchanged(etag, last_modified, digest)
+            state.checks += 1
+            state.changes += changed
+            result = "changed" if changed else "unchanged"
+        state.etag = etag
+        state.last_modified = last_modified
+        state.content_hash = digest
+        state.checked_at = now
+        state.revisit_at = now + self.interval(state)
+        return state, result
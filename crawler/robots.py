@@ -0,0 +1,168 @@
+import gzip
+import re
+import time
+from threading import Lock
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+from xml.etree import ElementTree
+
+from utils.metrics import metrics
+
+CRAWL_DELAY = re.compile(r"^(\s*crawl-delay\s*:\s*)(\d+(?:\.\d*)?|\.\d+)", re.IGNORECASE)
+
+
+def get_site(url):
+    """ scheme://host[:port] of a url; robots.txt applies per site. """
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+
+def parse_sitemap(content):
+    """
+    Returns (page urls, sitemap urls) listed in a sitemap or sitemap index,
+    gzipped or not.
+    """
+    if content[:2] == b"\x1f\x8b":
+        content = gzip.decompress(content)
+    root = ElementTree.fromstring(content)
+    locs = [
+        element.text.strip() for element in root.iter()
+        if element.tag.endswith("loc") and element.text]
+    if root.tag.endswith("sitemapindex"):
+        return list(), locs
+    return locs, list()
+
+
+def parse_robots(text):
+    """
+    A RobotFileParser for the lines of a robots.txt. It only reads whole
+    seconds of Crawl-delay, so fractional delays like 0.5 would be lost;
+    they are given to it in milliseconds instead (see RobotsCache.crawl_delay).
+    """
+    parser = RobotFileParser()
+    parser.parse(
+        CRAWL_DELAY.sub(lambda match: f"{match[1]}{round(float(match[2]) * 1000)}", line)
+        for line in text.splitlines())
+    return parser
+
+
+class SiteRules(object):
+    def __init__(self, parser, expires, sitemaps):
+        self.parser = parser
+        self.expires = expires
+        self.sitemaps = sitemaps
+
+
+class RobotsCache(object):
+    """
+    Parsed robots.txt rules per site, fetched through the crawler's own
+    download function (so they come from the cache server like any page)
+    and kept for `ttl` seconds.
+
+    A robots.txt that cannot be read (4xx) allows everything. Server or
+    cache errors allow everything too, but are only kept for
+    `error_ttl` seconds so the file is tried again soon. `delay` seconds
+    are waited after each fetch, as the page of the same host usually
+    follows right away. Crawl-delay values are capped at `max_delay`.
+    """
+    def __init__(self, download, config, logger=None, ttl=86400,
+                 error_ttl=600, max_delay=30.0, delay=0.0):
+        self.download = download
+        self.config = config
+        self.logger = logger
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_delay = max_delay
+        self.delay = delay
+        self.user_agent = config.user_agent
+        self.sites = dict()
+        self.lock = Lock()
+
+    @classmethod
+    def from_config(cls, download, config, logger=None):
+        return cls(
+            download, config, logger, config.robots_ttl, config.robots_error_ttl,
+            config.robots_max_delay, config.time_delay)
+
+    def _fetch(self, url):
+        resp = self.download(url, self.config, self.logger)
+        if self.delay:
+            time.sleep(self.delay)
+        content = getattr(resp.raw_response, "content", None)
+        return resp.status, content
+
+    def _load(self, site):
+        metrics.inc("robots_fetches_total")
+        status, content = self._fetch(f"{site}/robots.txt")
+        if status == 200 and content:
+            parser = parse_robots(content.decode("utf-8", errors="replace"))
+        else:
+            parser = RobotFileParser()
+            parser.allow_all = True
+        ttl = self.ttl if status < 500 else self.error_ttl
+        sitemaps = parser.site_maps() or list()
+        return SiteRules(parser, time.monotonic() + ttl, sitemaps)
+
+    def rules(self, url, fetch=True):
+        """
+        The rules of the url's site, fetching robots.txt if they are not
+        known or expired. Returns (rules, fetched now); with fetch=False
+        only known rules are returned (or None).
+        """
+        site = get_site(url)
+        with self.lock:
+            rules = self.sites.get(site)
+        if rules is not None and (not fetch or rules.expires > time.monotonic()):
+            return rules, False
+        if not fetch:
+            return None, False
+        rules = self._load(site)
+        with self.lock:
+            self.sites[site] = rules
+        return rules, True
+
+    def allowed(self, url, fetch=True):
+        """
+        Whether robots.txt allows fetching url. With fetch=False urls of
+        sites whose robots.txt was not fetched yet are allowed.
+        """
+        rules, _ = self.rules(url, fetch)
+        if rules is None:
+            return True
+        return rules.parser.can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url):
+        """ Crawl-delay of the url's site if it is known, else None. """
+        rules, _ = self.rules(url, fetch=False)
+        if rules is None:
+            return None
+        delay = rules.parser.crawl_delay(self.user_agent)
+        if delay is None:
+            return None
+        # In milliseconds, see parse_robots.
+        return min(delay / 1000, self.max_delay)
+
+    def sitemap_urls(self, sitemaps, max_urls, max_sitemaps=10):
+        """
+        Page urls listed in the given sitemaps, following sitemap indexes,
+        at most max_urls of them from at most max_sitemaps files.
+        """
+        urls = list()
+        pending = list(sitemaps)
+        fetched = 0
+        while pending and fetched < max_sitemaps and len(urls) < max_urls:
+            sitemap = pending.pop(0)
+            fetched += 1
+            metrics.inc("sitemap_fetches_total")
+            status, content = self._fetch(sitemap)
+            if status != 200 or not content:
+                continue
+            try:
+                pages, nested = parse_sitemap(content)
+            except (ElementTree.ParseError, OSError, EOFError) as e:
+                if self.logger:
+                    self.logger.error(f"Could not parse sitemap {sitemap}: {e}")
+                continue
+            urls.extend(pages[:max_urls - len(urls)])
+            pending.extend(nested)
+        return urls
@@ -0,0 +1,107 @@
+import heapq
+from collections import defaultdict
+from itertools import count
+from urllib.parse import urlparse
+
+
+def get_host(url):
+    return urlparse(url).hostname or ""
+
+
+class HostScheduler(object):
+    """
+    Per-host priority queues with a politeness delay between fetches to a
+    host.
+
+    Every queued url has a score (lower is crawled first, see
+    crawler/priority.py) and each host keeps its urls in a heap. A host is
+    handed out to at most one worker at a time. Once the fetch is released
+    the host waits `delay` seconds in the `waiting` heap, ordered by the
+    time it may be fetched again, and then moves to the `ready` heap,
+    ordered by the score of its best url. Push and pop are O(log n).
+    """
+    def __init__(self, delay):
+        self.delay = delay
+        self.queues = defaultdict(list)
+        self.next_allowed = dict()
+        # Urls handed out per host, for host fairness scores.
+        self.fetched = defaultdict(int)
+        self.busy = set()
+        self.waiting = list()
+        self.ready = list()
+        # Host -> score of its live entry in the ready heap. Entries with
+        # another score are stale and skipped.
+        self.ready_score = dict()
+        self.scheduled = set()
+        self.sequence = count()
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def _schedule(self, host):
+        if host in self.busy or host in self.scheduled or not self.queues.get(host):
+            return
+        heapq.heappush(self.waiting, (self.next_allowed.get(host, 0.0), host))
+        self.scheduled.add(host)
+
+    def _make_ready(self, host):
+        score = self.queues[host][0][0]
+        self.ready_score[host] = score
+        heapq.heappush(self.ready, (score, next(self.sequence), host))
+
+    def push(self, url, score=0, depth=0):
+        host = get_host(url)
+        heapq.heappush(self.queues[host], (score, next(self.sequence), url, depth))
+        self.count += 1
+        if host in self.ready_score and score < self.ready_score[host]:
+            # The host's best url changed while it is ready.
+            self._make_ready(host)
+        self._schedule(host)
+
+    def rescore(self, host, score):
+        """
+        Recomputes the score of every url queued for host as
+        score(url, depth), for scores that changed since the urls were
+        pushed.
+        """
+        queue = self.queues.get(host)
+        if not queue:
+            return
+        queue[:] = [(score(url, depth), seq, url, depth) for _, seq, url, depth in queue]
+        heapq.heapify(queue)
+        if host in self.ready_score and queue[0][0] != self.ready_score[host]:
+            self._make_ready(host)
+
+    def pop(self, now):
+        """
+        Returns (url, depth, None) for the best url among the hosts that may
+        be fetched now, or (None, None, seconds) with the time until the
+        next host becomes ready. seconds is None if nothing is queued.
+        """
+        while self.waiting and self.waiting[0][0] <= now:
+            _, host = heapq.heappop(self.waiting)
+            self._make_ready(host)
+        while self.ready:
+            score, _, host = heapq.heappop(self.ready)
+            if self.ready_score.get(host) != score:
+                continue
+            del self.ready_score[host]
+            self.scheduled.discard(host)
+            queue = self.queues[host]
+            _, _, url, depth = heapq.heappop(queue)
+            if not queue:
+                del self.queues[host]
+            self.count -= 1
+            self.fetched[host] += 1
+            self.busy.add(host)
+            return url, depth, None
+        if not self.waiting:
+            return None, None, None
+        return None, None, self.waiting[0][0] - now
+
+    def release(self, host, now, delay=None):
+        """ Marks the fetch from host as done and starts its delay. """
+        self.busy.discard(host)
+        self.next_allowed[host] = now + (self.delay if delay is None else delay)
+        self._schedule(host)
@@ -0,0 +1,192 @@
+import os
+import shelve
+import sqlite3
+import time
+
+from crawler.recrawl import PageState
+
+# Columns of a page's PageState, added to save files that predate them.
+PAGE_COLUMNS = (
+    ("etag", "TEXT"), ("last_modified", "TEXT"), ("content_hash", "TEXT"),
+    ("first_checked", "REAL"), ("checked_at", "REAL"), ("revisit_at", "REAL"),
+    ("checks", "INTEGER NOT NULL DEFAULT 0"), ("changes", "INTEGER NOT NULL DEFAULT 0"))
+
+
+class SqliteStore(object):
+    """
+    Frontier save file kept in SQLite (WAL mode) with the same mapping
+    interface the frontier uses on a shelve:
+    urlhash -> (url, completed, depth). Each row also holds the url's
+    PageState (crawler/recrawl.py), read and written with page_state() and
+    set_page_state().
+
+    Writes are grouped into transactions. sync() only commits once
+    `commit_ops` writes are pending or `commit_ms` milliseconds have passed
+    since the last commit, instead of flushing to disk on every url. Writes
+    are committed in the order they were made, so after a crash the save
+    file holds a consistent prefix of the crawl: a url is never recorded
+    complete without the urls discovered on it.
+    """
+    def __init__(self, save_file, commit_ops=500, commit_ms=1000):
+        self.save_file = save_file
+        self.commit_ops = commit_ops
+        self.commit_ms = commit_ms
+        self.conn = sqlite3.connect(save_file, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls ("
+            "urlhash TEXT PRIMARY KEY, url TEXT NOT NULL, "
+            "completed INTEGER NOT NULL, depth INTEGER NOT NULL DEFAULT 0)")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(urls)")]
+        if "depth" not in columns:
+            # Save file written before urls had a depth.
+            self.conn.execute(
+                "ALTER TABLE urls ADD COLUMN depth INTEGER NOT NULL DEFAULT 0")
+        for name, declaration in PAGE_COLUMNS:
+            if name not in columns:
+                self.conn.execute(f"ALTER TABLE urls ADD COLUMN {name} {declaration}")
+        # Only the urls still to be downloaded, for resuming a crawl.
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS pending_urls ON urls (completed) "
+            "WHERE completed = 0")
+        # Downloaded urls by when they are due again, for re-crawls.
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS revisit_urls ON urls (revisit_at) "
+            "WHERE completed = 1")
+        self.conn.commit()
+        self.pending_ops = 0
+        self.last_commit = time.monotonic()
+
+    def __contains__(self, urlhash):
+        return self.conn.execute(
+            "SELECT 1 FROM urls WHERE urlhash = ?", (urlhash,)).fetchone() is not None
+
+    def __getitem__(self, urlhash):
+        row = self.conn.execute(
+            "SELECT url, completed, depth FROM urls WHERE urlhash = ?",
+            (urlhash,)).fetchone()
+        if row is None:
+            raise KeyError(urlhash)
+        return row[0], bool(row[1]), row[2]
+
+    def __setitem__(self, urlhash, value):
+        url, completed, depth = value
+        # Keeps the page state of a url that is marked complete again.
+        self.conn.execute(
+            "INSERT INTO urls (urlhash, url, completed, depth) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (urlhash) DO UPDATE SET url = excluded.url, "
+            "completed = excluded.completed, depth = excluded.depth",
+            (urlhash, url, int(completed), depth))
+        self.pending_ops += 1
+
+    def page_state(self, urlhash):
+        """ The url's PageState, or None if it was never checked. """
+        row = self.conn.execute(
+            f"SELECT {', '.join(name for name, _ in PAGE_COLUMNS)} FROM urls "
+            "WHERE urlhash = ? AND content_hash IS NOT NULL", (urlhash,)).fetchone()
+        return None if row is None else PageState(*row)
+
+    def set_page_state(self, urlhash, state):
+        self.conn.execute(
+            f"UPDATE urls SET {', '.join(f'{name} = ?' for name, _ in PAGE_COLUMNS)} "
+            "WHERE urlhash = ?",
+            tuple(getattr(state, name) for name, _ in PAGE_COLUMNS) + (urlhash,))
+        self.pending_ops += 1
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM urls").fetchone()[0]
+
+    def keys(self):
+        for (urlhash,) in self.conn.execute("SELECT urlhash FROM urls"):
+            yield urlhash
+
+    def values(self):
+        for url, completed, depth in self.conn.execute(
+                "SELECT url, completed, depth FROM urls"):
+            yield url, bool(completed), depth
+
+    def pending(self, chunk_size=10000, due_before=None):
+        """
+        Yields lists of (url, depth) of the urls not completed yet and, with
+        due_before, of the downloaded pages due for a revisit by then. Urls
+        without a page state (errors, redirects, urls disallowed by
+        robots.txt or blocked as traps) have no revisit time and are not
+        fetched again. The urls are read on a separate connection in one
+        snapshot, so this can run in another thread while the crawl keeps
+        writing.
+        """
+        queries = [("SELECT url, depth FROM urls WHERE completed = 0", ())]
+        if due_before is not None:
+            queries.append((
+                "SELECT url, depth FROM urls WHERE completed = 1 "
+                "AND revisit_at <= ?", (due_before,)))
+        conn = sqlite3.connect(self.save_file, isolation_level=None)
+        try:
+            conn.execute("BEGIN")
+            for query, parameters in queries:
+                cursor = conn.execute(query, parameters)
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+        finally:
+            conn.close()
+
+    def commit_due(self, force=False):
+        """ Whether sync() would commit the pending writes now. """
+        return bool(self.pending_ops) and (
+            force or self.pending_ops >= self.commit_ops
+            or (time.monotonic() - self.last_commit) * 1000 >= self.commit_ms)
+
+    def sync(self, force=False):
+        """ Commits the pending writes if the batch is full or old enough. """
+        if self.commit_due(force):
+            self.conn.commit()
+            self.pending_ops = 0
+            self.last_commit = time.monotonic()
+
+    def close(self):
+        self.sync(force=True)
+        self.conn.close()
+
+
+def open_store(config):
+    """ Opens the save file with the backend chosen by SAVEBACKEND. """
+    if config.save_backend == "shelve":
+        # The original backend, synced to disk on every write.
+        return shelve.open(config.save_file)
+    return SqliteStore(
+        config.save_file, config.save_commit_ops, config.save_commit_ms)
+
+
+def pending_urls(save, chunk_size=10000, due_before=None):
+    """
+    Chunks of (url, depth) not completed yet, for either backend; see
+    SqliteStore.pending for due_before, which needs SQLite.
+    """
+    if hasattr(save, "pending"):
+        yield from save.pending(chunk_size, due_before)
+        return
+    chunk = list()
+    for record in save.values():
+        # Older save files have no depth.
+        url, completed, depth = (tuple(record) + (0,))[:3]
+        if not completed:
+            chunk.append((url, depth))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = list()
+    if chunk:
+        yield chunk
+
+
+def remove_store(save_file):
+    # SQLite keeps -wal/-shm files next to the database and some dbm
+    # backends used by shelve add their own suffixes. The frontier keeps
+    # its url digests in a .seen file and its link graph in a .links file
+    # next to it.
+    for suffix in ("", "-wal", "-shm", ".db", ".dat", ".dir", ".bak", ".seen", ".links"):
+        if os.path.exists(save_file + suffix):
+            os.remove(save_file + suffix)
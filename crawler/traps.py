@@ -0,0 +1,135 @@
+import re
+from collections import Counter
+from urllib.parse import urlparse, parse_qsl
+
+NUMBER = re.compile(r"\d+")
+
+
+def get_template(url):
+    """
+    Groups urls that only differ in numbers and query values:
+    https://ics.uci.edu/events/2019/10/?page=3&view=day becomes
+    ("ics.uci.edu", "/events/<n>/<n>?page&view").
+    """
+    parsed = urlparse(url)
+    path = NUMBER.sub("<n>", parsed.path)
+    keys = sorted({key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)})
+    if keys:
+        path += "?" + "&".join(keys)
+    return parsed.hostname or "", path
+
+
+class TemplateStats(object):
+    def __init__(self):
+        self.discovered = 0
+        self.query_values = set()
+        self.pages = Counter()
+        self.blocked = None
+        self.throttled = False
+
+    def bad_pages(self):
+        return self.pages["low_content"] + self.pages["duplicate"] + self.pages["error"]
+
+    def summary(self):
+        return (f"discovered={self.discovered} "
+                f"query_values={len(self.query_values)} "
+                f"fetched={sum(self.pages.values())} "
+                f"low_content={self.pages['low_content']} "
+                f"duplicate={self.pages['duplicate']} "
+                f"error={self.pages['error']}")
+
+
+class TrapDetector(object):
+    """
+    Keeps statistics per host and url path template (see get_template) and
+    stops the frontier from spending fetches on crawler traps.
+
+    Single urls are rejected when their path is deeper than `max_depth`
+    segments or repeats a segment `max_repeats` times. A template is
+    blocked once it produced more than `max_query_values` distinct query
+    strings, or when at least `min_pages` of its pages were fetched and
+    the share of low content, near duplicate or error pages reaches
+    `block_ratio`. Above `throttle_ratio` only one in `throttle_every` new
+    urls of the template is admitted.
+    """
+    def __init__(self, max_depth=12, max_repeats=3, max_query_values=500,
+                 min_pages=20, throttle_ratio=0.5, block_ratio=0.8,
+                 throttle_every=10):
+        self.max_depth = max_depth
+        self.max_repeats = max_repeats
+        self.max_query_values = max_query_values
+        self.min_pages = min_pages
+        self.throttle_ratio = throttle_ratio
+        self.block_ratio = block_ratio
+        self.throttle_every = throttle_every
+        self.templates = dict()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            config.trap_max_depth, config.trap_max_repeats,
+            config.trap_max_query_values, config.trap_min_pages,
+            config.trap_throttle_ratio, config.trap_block_ratio,
+            config.trap_throttle_every)
+
+    def _stats(self, url):
+        template = get_template(url)
+        stats = self.templates.get(template)
+        if stats is None:
+            stats = self.templates[template] = TemplateStats()
+        return stats
+
+    def allow(self, url):
+        """ Records a newly discovered url and says whether to queue it. """
+        segments = [segment for segment in urlparse(url).path.split("/") if segment]
+        if len(segments) > self.max_depth:
+            return False
+        if segments and Counter(segments).most_common(1)[0][1] >= self.max_repeats:
+            return False
+
+        stats = self._stats(url)
+        if stats.blocked:
+            return False
+        stats.discovered += 1
+        query = urlparse(url).query
+        if query:
+            stats.query_values.add(query)
+            if len(stats.query_values) > self.max_query_values:
+                stats.blocked = "query values"
+                return False
+        if stats.throttled:
+            return stats.discovered % self.throttle_every == 0
+        return True
+
+    def allow_fetch(self, url):
+        """ False for queued urls whose template got blocked meanwhile. """
+        stats = self.templates.get(get_template(url))
+        return not (stats and stats.blocked)
+
+    def record_page(self, url, kind):
+        """
+        Records the outcome of a fetched page: "ok", "low_content",
+        "duplicate" or "error".
+        """
+        stats = self._stats(url)
+        stats.pages[kind] += 1
+        fetched = sum(stats.pages.values())
+        if fetched < self.min_pages or stats.blocked:
+            return
+        ratio = stats.bad_pages() / fetched
+        if ratio >= self.block_ratio:
+            stats.blocked = "low quality pages"
+        stats.throttled = ratio >= self.throttle_ratio
+
+    def blocked_patterns(self):
+        """ (host, template, reason, summary) of every blocked template. """
+        return [
+            (host, template, stats.blocked, stats.summary())
+            for (host, template), stats in sorted(self.templates.items())
+            if stats.blocked]
+
+    def export(self, path):
+        """ Writes the blocked templates to path for review, one per line. """
+        with open(path, "w") as file:
+            for host, template, reason, summary in self.blocked_patterns():
+                file.write(f"{host}\t{template}\t{reason}\t{summary}\n")
@@ -1,10 +1,11 @@
+import time
 from threading import Thread
 
 from inspect import getsource
-from utils.download import download
+from utils.download import get_download
 from utils import get_logger
+from utils.metrics import metrics
 import scraper
-import time
 
 
 class Worker(Thread):
@@ -12,6 +13,7 @@ class Worker(Thread):
         self.logger = get_logger(f"Worker-{worker_id}", "Worker")
         self.config = config
         self.frontier = frontier
+        self.download = get_download(config)
         # basic check for requests in scraper
         assert {getsource(scraper).find(req) for req in {"from requests import", "import requests"}} == {-1}, "Do not use requests in scraper.py"
         assert {getsource(scraper).find(req) for req in {"from urllib.request import", "import urllib.request"}} == {-1}, "Do not use urllib.request in scraper.py"
@@ -19,16 +21,39 @@ class Worker(Thread):
         
     def run(self):
         while True:
-            tbd_url = self.frontier.get_tbd_url()
+            with metrics.timer("frontier_wait"):
+                tbd_url = self.frontier.get_tbd_url()
             if not tbd_url:
                 self.logger.info("Frontier is empty. Stopping Crawler.")
                 break
-            resp = download(tbd_url, self.config, self.logger)
-            self.logger.info(
-                f"Downloaded {tbd_url}, status <{resp.status}>, "
-                f"using cache {self.config.cache_server}.")
-            scraped_urls = scraper.scraper(tbd_url, resp)
-            for scraped_url in scraped_urls:
-                self.frontier.add_url(scraped_url)
-            self.frontier.mark_url_complete(tbd_url)
-            time.sleep(self.config.time_delay)
+            status = latency = None
+            try:
+                start = time.monotonic()
+                try:
+                    with metrics.timer("download"):
+                        resp = self.download(tbd_url, self.config, self.logger)
+                except Exception as e:
+                    # Timeouts and connection errors: the frontier backs
+                    # off the host and retries the url later.
+                    latency = time.monotonic() - start
+                    self.logger.error(f"Failed to download {tbd_url}: {e}")
+                    metrics.inc("download_errors_total")
+                    continue
+                latency = time.monotonic() - start
+                status = resp.status
+                metrics.inc("pages_total")
+                metrics.inc("responses_total", status=resp.status)
+                # Size of the pickled page, which is not unpickled here.
+                metrics.inc("bytes_total", resp.size)
+                self.logger.info(
+                    f"Downloaded {tbd_url}, status <{resp.status}>, "
+                    f"using cache {self.config.cache_server}.")
+                with metrics.timer("scrape"):
+                    scraped_urls = scraper.scraper(tbd_url, resp)
+                with metrics.timer("frontier_add"):
+                    for scraped_url in scraped_urls:
+                        self.frontier.add_url(scraped_url, tbd_url)
+            finally:
+                # The frontier enforces the per-host delay from the moment
+                # the url is marked complete.
+                self.frontier.mark_url_complete(tbd_url, status, latency)
@@ -4,20 +4,31 @@ from argparse import ArgumentParser
 from utils.server_registration import get_cache_server
 from utils.config import Config
 from crawler import Crawler
+from crawler.multiproc import ShardRouter, ShardProcess
 
 
-def main(config_file, restart):
+def main(config_file, restart, recrawl):
     cparser = ConfigParser()
     cparser.read(config_file)
     config = Config(cparser)
-    config.cache_server = get_cache_server(config, restart)
-    crawler = Crawler(config, restart)
+    if recrawl:
+        config.recrawl = True
+    if config.record_mode == "replay":
+        # Responses come from disk: no cache server and no politeness delay.
+        config.time_delay = 0
+    else:
+        config.cache_server = get_cache_server(config, restart)
+    if config.crawl_mode == "processes":
+        crawler = Crawler(config, restart, ShardRouter, ShardProcess)
+    else:
+        crawler = Crawler(config, restart)
     crawler.start()
 
 
 if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("--restart", action="store_true", default=False)
+    parser.add_argument("--recrawl", action="store_true", default=False)
     parser.add_argument("--config_file", type=str, default="config.ini")
     args = parser.parse_args()
-    main(args.config_file, args.restart)
+    main(args.config_file, args.restart, args.recrawl)
@@ -1,14 +1,102 @@
-import re
 from urllib.parse import urlparse, urldefrag, urljoin, urlunparse
-from bs4 import BeautifulSoup
-from utils import get_logger
-import json
-import os
+from utils import content_hash, get_logger
+from utils.metrics import metrics
+from utils.page_store import PageStore
+from utils.page_parser import parse_page
+from utils.report import load_report
+from utils.simhash import SimHashIndex, simhash
+from utils.token_store import TokenAggregator
+from utils.tokenizer import Tokenizer
+from utils.url_filter import UrlFilter
+from utils.visited import VisitedIndex
+from threading import RLock
+import atexit
 
 
 token_shelve = "token_shelve"
 logger = get_logger("SCRAPER")
-traps = ["/pdf/", "archive.ics.uci.edu", "Nanda", "timeline?", "version=", "action=login", "action=download", "ics.uci.edu/events", "isg.ics.uci.edu/events/tag/talks/day", "share=facebook", "share=twitter", ".pdf", ".ps"]
+# One record per counted page, see utils/page_store.py. Crawls from before
+# it kept two "url,count" text files, which are imported on first use.
+page_store = PageStore(
+    "page_records.bin",
+    legacy_files=("all_webpage_count.txt", "all_webpage_count_no_stopwords.txt"))
+visited_index = VisitedIndex(page_store)
+token_aggregator = TokenAggregator(
+    "token_frequencies.checkpoint.json", "token_frequencies.log",
+    legacy_files=("token_frequencies.json", "token_frequencies_nostop.json"))
+record_lock = RLock()
+report_file = "report.txt"
+# Loaded from the count files on first use, then kept up to date per page.
+crawl_report = None
+url_filter = UrlFilter(logger=logger)
+page_tokenizer = Tokenizer()
+near_duplicates = SimHashIndex("page_fingerprints.txt")
+# Called with (url, kind) for every scraped page, see report_page.
+page_listeners = list()
+# The frontier's robots.txt rules, see set_robots.
+robots_rules = None
+# The frontier's page change check, see set_content_check. In a re-crawl,
+# visited pages are downloaded again and checked for changes.
+content_check = None
+recrawl = False
+# Pages above max_page_bytes are truncated to it, or skipped with the "skip"
+# oversize policy; only the first max_page_tokens words are counted.
+max_page_bytes = 5000000
+max_page_tokens = 500000
+oversize_policy = "truncate"
+# Content types worth parsing; pages without a Content-Type are parsed too.
+TEXT_CONTENT_TYPES = (
+    "text/html", "text/plain", "application/xhtml+xml", "text/xml", "application/xml")
+
+
+def configure(config):
+    """
+    Applies the crawler config to the scraper. Called by the Crawler before
+    the frontier is created; without it the built-in rules are used.
+    """
+    global url_filter, page_tokenizer, near_duplicates
+    global max_page_bytes, max_page_tokens, oversize_policy, recrawl
+    url_filter = UrlFilter.from_rules(config.filter_rules, logger=logger)
+    page_tokenizer = Tokenizer.from_config(config)
+    max_page_bytes = config.max_page_bytes
+    max_page_tokens = config.max_page_tokens
+    oversize_policy = config.oversize_policy
+    recrawl = config.recrawl
+    near_duplicates = SimHashIndex(
+        "page_fingerprints.txt", config.near_duplicate_bits)
+
+
+def add_page_listener(listener):
+    page_listeners.append(listener)
+
+
+def set_robots(robots):
+    """
+    Makes is_valid reject urls that robots.txt disallows, for sites whose
+    robots.txt the frontier has already fetched.
+    """
+    global robots_rules
+    robots_rules = robots
+
+
+def set_content_check(check):
+    """
+    Makes every downloaded page go through check(url, headers, content),
+    which says whether it is "new", "changed" or "unchanged" since its
+    last download.
+    """
+    global content_check
+    content_check = check
+
+
+def report_page(url, kind):
+    """
+    Tells the listeners (e.g. the frontier's trap detector) how a page
+    turned out: "ok", "low_content", "duplicate", "unchanged" or "error".
+    """
+    metrics.inc("scraped_pages_total", kind=kind)
+    for listener in page_listeners:
+        listener(url, kind)
 
 
 def scraper(url, resp):
@@ -28,13 +116,16 @@ def extract_next_links(url, resp):
     # Return a list with the hyperlinks (as strings) scrapped from resp.raw_response.content
     links = []
 
-    already_visited = check_if_visited_page(url)
-    if already_visited:
+    with metrics.timer("visited_check"):
+        already_visited = check_if_visited_page(url)
+    # A re-crawl downloads visited pages again to look for changes.
+    if already_visited and not (recrawl and content_check):
         return links
 
     num = is_valid_response(resp)
 
     if num == 4:
+        report_page(url, "error")
         return links
     elif num == 3:
         redirected_url = resp.raw_response.url
@@ -42,20 +133,51 @@ def extract_next_links(url, resp):
             links.append(redirected_url)
     elif num == 2:
         try:
-            # parsing html content
-            soup = BeautifulSoup(resp.raw_response.content, 'html.parser')
-            
-            if not has_sufficient_content(soup):
+            content = page_content(url, resp.raw_response)
+            if content is None:
+                report_page(url, "low_content")
                 return links
 
-            if has_nofollow_meta(soup):
+            digest = content_hash(content)
+            if content_check is not None:
+                change = content_check(url, resp.raw_response.headers, digest)
+                # A page first visited now is processed even if a state
+                # was kept for it before, e.g. when it had too little text.
+                if change == "unchanged" and already_visited:
+                    report_page(url, "unchanged")
+                    return links
+
+            # parsing html content: text, links and robots meta in one pass
+            with metrics.timer("parse"):
+                page = parse_page(
+                    content, content_type=resp.raw_response.headers.get("Content-Type"))
+
+            if not has_sufficient_content(page):
+                report_page(url, "low_content")
                 return links
 
-            links = extract_hyperlinks(url, soup)
-            tokenizer(url, soup)
+            if has_nofollow_meta(page):
+                return links
+
+            # A changed page was counted at its first visit: only its
+            # links are followed again, so no token is counted twice.
+            if not already_visited:
+                with metrics.timer("tokenize"):
+                    token_frequencies = tokenizer(url, page, digest, resp.status)
+
+                # Same content under another url, don't expand its links again.
+                with metrics.timer("near_duplicate"):
+                    duplicate = is_near_duplicate(url, token_frequencies)
+                if duplicate:
+                    report_page(url, "duplicate")
+                    return links
+
+            links = extract_hyperlinks(url, page)
+            report_page(url, "ok")
 
         except Exception as e:
             print(f"Error parsing {url}: {e}")
+            report_page(url, "error")
 
     links = list(set(links))  # removes duplicates
     return links
@@ -67,26 +189,7 @@ def check_if_visited_page(url) -> bool:
     returns an bool value based on status.
     """
     try:
-
-        if not os.path.exists("all_webpage_count.txt"):
-            open("all_webpage_count.txt", "w").close()
-            open("all_webpage_count_no_stopwords.txt", "w").close()
-
-        visited_urls = set()
-        decoded_url = url.replace("%7E", "~") ## converts %7E to ~
-        base_url, frag = urldefrag(decoded_url)
-        base_url = base_url.replace("/www.", "/")
-
-        try:
-            with open("all_webpage_count.txt", "r") as file:
-                for line in file:
-                    v_url = line.split(',')[0].strip()
-                    visited_urls.add(v_url.replace("%7E", "~"))
-
-        except Exception as e:
-            logger.info(f"{e}: {url}")
-
-        if base_url in visited_urls:
+        if url in visited_index:
             logger.info(f"Already visited: {url}")
             return True
 
@@ -97,6 +200,21 @@ def check_if_visited_page(url) -> bool:
     return False
 
 
+def is_near_duplicate(url, token_frequencies) -> bool:
+    """
+    Checks if the page's content is almost the same as an already crawled
+    page (SimHash fingerprints within a few bits), and indexes it if not.
+    Pages without tokens all hash to 0, so they are not compared.
+    """
+    if not token_frequencies:
+        return False
+    duplicate = near_duplicates.find_or_add(simhash(token_frequencies), url)
+    if duplicate:
+        logger.info(f"Near duplicate of {duplicate}: {url}")
+        return True
+    return False
+
+
 def is_valid_response(resp) -> int:
     """
     Checks if the response is valid (status 200-399 and contains content).
@@ -108,31 +226,54 @@ def is_valid_response(resp) -> int:
     if 200 <= resp.status < 400:
         if resp.status >= 300:  # Handle redirects
             return 3
-        if bool(resp.raw_response.content.strip()):  # Ensure content is not empty
+        content = resp.raw_response.content
+        if content and not content.isspace():  # Ensure content is not empty
             return 2
     return 4
 
 
-def has_sufficient_content(soup):
+def page_content(url, raw_response):
+    """
+    Returns the body of the page to parse, or None if it should not be
+    parsed: not a text content type, or larger than max_page_bytes with the
+    "skip" oversize policy. With "truncate" the first max_page_bytes are
+    parsed.
+    """
+    content_type = raw_response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+    if content_type and content_type not in TEXT_CONTENT_TYPES:
+        logger.info(f"Skipping {content_type} content: {url}")
+        return None
+    content = raw_response.content
+    try:
+        size = int(raw_response.headers.get("Content-Length", len(content)))
+    except ValueError:
+        size = len(content)
+    if max(size, len(content)) <= max_page_bytes:
+        return content
+    if oversize_policy == "skip":
+        logger.info(f"Skipping {size} byte page: {url}")
+        return None
+    logger.info(f"Truncating {size} byte page to {max_page_bytes} bytes: {url}")
+    return content[:max_page_bytes]
+
+
+def has_sufficient_content(page):
     """
     Ensures the page has enough textual content to be worth crawling.
     """
-    doc_words = (soup.get_text(separator=" ")).split()
-    if len(doc_words) < 100:
+    if sum(1 for _ in page.iter_words(100)) < 100:
         return False
     return True
 
 
-def has_nofollow_meta(soup):
+def has_nofollow_meta(page):
     """
     Checks if the page has a nofollow meta tag
     """
-    robot = soup.find('meta', attrs={'name': 'robots'})
-    if robot and 'nofollow' in robot.get('content', '').lower():
-        return robot and 'nofollow' in robot.get('content', '').lower()
+    return 'nofollow' in page.robots
 
 
-def extract_hyperlinks(url, soup):
+def extract_hyperlinks(url, page):
     """
     Extracts hyperlinks from the parsed HTML content
     """
@@ -140,8 +281,7 @@ def extract_hyperlinks(url, soup):
     # finds all the <a> tags which mean hyperlink and get their href
     # example1: <a href="https://www.ics.uci.edu/contact-us"></a>
     # example2: <a href="about-us"></a>
-    for link in soup.find_all('a', href=True):
-        raw_link = link['href']  # extracts the link "https://www.ics.uci.edu/contact-us", "about-us"
+    for raw_link in page.hrefs:  # extracts the link "https://www.ics.uci.edu/contact-us", "about-us"
         complete_url = urljoin(url, raw_link)  # joins it to the base url - "https://www.ics.uci.edu/about-us"
         decoded_url = url_decoder(complete_url)  # Converts %7E to ~ in urls so that urls that are encoded do not get duplicated
         clean_url, _ = urldefrag(decoded_url)  # Remove fragments
@@ -178,126 +318,67 @@ def normalize_url(url):
 def is_valid(url):
     # Decide whether to crawl this url or not. 
     # If you decide to crawl it, return True; otherwise return False.
-    # There are already some conditions that return False.
-    try:
-        parsed = urlparse(url)
-        if parsed.scheme not in {"http", "https"}:
-            return False
-
-        # Ensures that there is a hostname before examining the URL
-        if not parsed.hostname:
-            return False
-
-        # Domain needs to be one of these, allows subdomains
-        if not re.match(r"(.*\.)?(ics|cs|informatics|stat)\.uci\.edu",
-                        parsed.hostname):  # domain needs to be one of these, allows subdomains
-            return False
-
-        # Domain can't have any "2000-01-03" etc
-        if re.search(r"\b\d{4}-\d{2}-\d{2}\b", parsed.path):
-            logger.info(f"Date in url: {url}")
-            return False
-
-        # Removes unwanted tags in the URL, such as calendars or excessive dates
-        if any(keyword in parsed.query.lower() for keyword in
-               ["ical=", "outlook-ical=", "tribe-bar-date=", "eventdate=", "calendar-view", "date="]):
-            return False
-
-        # Ensures that the crawler avoids potential traps
-        for t in traps:
-            if t in parsed.geturl():
-                return False
-
-        # Returns the URL if it doesn't end with any of these extension tags
-        return not re.match(
-            r".*\.(css|js|bmp|gif|jpe?g|ico|img|sql|ipynb|war|bam|mpg|ppsx"
-            + r"|png|tiff?|mid|mp2|mp3|mp4"
-            + r"|wav|avi|mov|mpeg|ram|m4v|mkv|ogg|ogv|pdf"
-            + r"|ps|eps|tex|ppt|pptx|doc|docx|xls|xlsx|names"
-            + r"|data|dat|exe|bz2|tar|msi|bin|7z|psd|dmg|iso"
-            + r"|epub|dll|cnf|tgz|sha1"
-            + r"|thmx|mso|arff|rtf|jar|csv"
-            + r"|rm|smil|wmv|swf|wma|zip|rar|gz)$", parsed.path.lower())
-    except TypeError:
-        print("TypeError for ", parsed)
-        raise
-
-
-def tokenizer(url, soup):
-    doc_words = (soup.get_text(separator=" ")).split()
-    stopwords_set = {"a", "about", "above", "after", "again", "against", "all", "am", "an", "and", "any", "are",
-                     "aren't", "as", "at", "be", "because", "been", "before", "being", "below", "between", "both",
-                     "but", "by", "can't", "cannot", "could", "couldn't", "did", "didn't", "do", "does", "doesn't",
-                     "doing", "don't", "down", "during", "each", "few", "for", "from", "further", "had", "hadn't",
-                     "has", "hasn't", "have", "haven't", "having", "he", "he'd", "he'll", "he's", "her", "here",
-                     "here's", "hers", "herself", "him", "himself", "his", "how", "how's", "i", "i'd", "i'll", "i'm",
-                     "i've", "if", "in", "into", "is", "isn't", "it", "it's", "its", "itself", "let's", "me", "more",
-                     "most", "mustn't", "my", "myself", "no", "nor", "not", "of", "off", "on", "once", "only", "or",
-                     "other", "ought", "our", "ours", "ourselves", "out", "over", "own", "same", "shan't", "she",
-                     "she'd", "she'll", "she's", "should", "shouldn't", "so", "some", "such", "than", "that", "that's",
-                     "the", "their", "theirs", "them", "themselves", "then", "there", "there's", "these", "they",
-                     "they'd", "they'll", "they're", "they've", "this", "those", "through", "to", "too", "under",
-                     "until", "up", "very", "was", "wasn't", "we", "we'd", "we'll", "we're", "we've", "were", "weren't",
-                     "what", "what's", "when", "when's", "where", "where's", "which", "while", "who", "who's", "whom",
-                     "why", "why's", "with", "won't", "would", "wouldn't", "you", "you'd", "you'll", "you're", "you've",
-                     "your", "yours", "yourself", "yourselves"}
-    token_frequencies = {}
-    token_frequencies_no_stop_words = {}
-
-    url_words = 0
-    url_words_no_stop_words = 0
-
-    for token in doc_words:
-        token = token.lower()
-        url_words += 1
-        if token not in token_frequencies:
-            token_frequencies[token] = 1
-        else:
-            token_frequencies[token] += 1
-        if token not in stopwords_set:
-            url_words_no_stop_words += 1
-            if token not in token_frequencies_no_stop_words:
-                token_frequencies_no_stop_words[token] = 1
-            else:
-                token_frequencies_no_stop_words[token] += 1
-    try:
-        token_frequencies_json = "token_frequencies.json"
-        token_frequencies_nostop_json = "token_frequencies_nostop.json"
-        with open(token_frequencies_json, "r") as f:
-            old_frequencies = json.load(f)
-
-        with open(token_frequencies_nostop_json, "r") as f:
-            old_frequencies_nostop = json.load(f)
-
-    except FileNotFoundError:
-        old_frequencies = {}
-        old_frequencies_nostop = {}
-
-    for token, count in token_frequencies.items():
-        if token in old_frequencies:
-            old_frequencies[token] += count
-        else:
-            old_frequencies[token] = count
-
-    for token, count in token_frequencies_no_stop_words.items():
-        if token in old_frequencies_nostop:
-            old_frequencies_nostop[token] += count
-        else:
-            old_frequencies_nostop[token] = count
-
-    with open(token_frequencies_json, "w") as f:
-        json.dump(old_frequencies, f)
-
-    with open(token_frequencies_nostop_json, "w") as f:
-        json.dump(old_frequencies_nostop, f)
-
-    all_webpage_count = "all_webpage_count.txt"
-    with open(all_webpage_count, "a") as file:
-        text_to_write = f"{url},{url_words}\n"
-        file.write(text_to_write)
-
-    all_webpage_count_no_stopwords = "all_webpage_count_no_stopwords.txt"
-
-    with open(all_webpage_count_no_stopwords, "a") as file:
-        text_to_write = f"{url},{url_words_no_stop_words}\n"
-        file.write(text_to_write)
+    # The rules are compiled once in utils/url_filter.py and can be
+    # overridden in the [FILTER] section of the config file.
+    if not url_filter.is_valid(url):
+        return False
+    return robots_rules is None or robots_rules.allowed(url, fetch=False)
+
+
+def tokenizer(url, page, digest=None, status=200):
+    # Counted in bulk by utils/tokenizer.py, capped at max_page_tokens.
+    token_frequencies, token_frequencies_no_stop_words = page_tokenizer.count(
+        page.text, max_page_tokens)
+    url_words = sum(token_frequencies.values())
+    url_words_no_stop_words = sum(token_frequencies_no_stop_words.values())
+    token_aggregator.add_page(token_frequencies, token_frequencies_no_stop_words)
+
+    with record_lock, metrics.timer("record_page"):
+        report = get_crawl_report()
+        page_store.add(url, url_words, url_words_no_stop_words, digest, status)
+        visited_index.add(url)
+
+        report.add_page(url, url_words)
+        report.update_words(token_aggregator.totals_for(token_frequencies_no_stop_words))
+
+    return token_frequencies_no_stop_words
+
+
+def get_crawl_report():
+    """
+    Returns the running crawl report, built from the existing page records
+    and token totals the first time it is needed.
+    """
+    global crawl_report
+    with record_lock:
+        if crawl_report is None:
+            crawl_report = load_report(page_store, token_aggregator)
+        return crawl_report
+
+
+def write_report():
+    get_crawl_report().write(report_file)
+
+
+def flush():
+    """
+    Writes the buffered token counts and page records to disk. The frontier
+    calls it before it commits urls as complete, so a crash cannot lose the
+    counts or the record of a page whose url will not be downloaded again.
+    """
+    token_aggregator.flush()
+    page_store.flush()
+
+
+def close():
+    """
+    Writes the token totals, page records and the report to disk. Runs at exit; worker
+    processes, which skip atexit handlers, call it themselves.
+    """
+    token_aggregator.close()
+    page_store.close()
+    if crawl_report is not None:
+        write_report()
+
+
+atexit.register(close)
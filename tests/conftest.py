@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+from configparser import ConfigParser
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+
+def make_config_parser(**sections):
+    """
+    The repo's config.ini with settings for offline runs: no robots.txt,
+    no politeness delay, no link graph. `sections` overrides options, e.g.
+    CRAWLER={"SEEDURL": "https://a.ics.uci.edu/"}.
+    """
+    parser = ConfigParser()
+    parser.read(os.path.join(REPO_DIR, "config.ini"))
+    parser["CRAWLER"]["POLITENESS"] = "0"
+    parser["ROBOTS"]["ENABLED"] = "false"
+    parser["LINKS"]["ENABLED"] = "false"
+    parser["LOCAL PROPERTIES"]["METRICSPORT"] = "0"
+    for section, options in sections.items():
+        if not parser.has_section(section):
+            parser.add_section(section)
+        for name, value in options.items():
+            parser[section][name] = str(value)
+    return parser
+
+
+@pytest.fixture
+def in_tmp_path(tmp_path, monkeypatch):
+    """ Runs the test in tmp_path, where the crawler writes its files. """
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run_stub_crawl(directory, pages, **sections):
+    """
+    Crawls `pages` ({url: (status, body str, headers)}) served by a
+    StubCacheServer, in its own process in `directory`, and returns the
+    requests the stub served as [(url, seconds since the crawl started)].
+    The first url is the seed unless SEEDURL is overridden.
+    """
+    sections.setdefault("CRAWLER", {}).setdefault("SEEDURL", next(iter(pages)))
+    files = {name: os.path.join(directory, f"{name}.json")
+             for name in ("pages", "overrides", "requests")}
+    with open(files["pages"], "w") as file:
+        json.dump(pages, file)
+    with open(files["overrides"], "w") as file:
+        json.dump(sections, file)
+    subprocess.run(
+        [sys.executable, os.path.join(REPO_DIR, "tests", "stub_crawl.py"),
+         files["pages"], files["overrides"], files["requests"]],
+        cwd=directory, check=True, capture_output=True, timeout=300)
+    with open(files["requests"]) as file:
+        return [tuple(request) for request in json.load(file)]
+
+
+def html_page(text, links=()):
+    """ A 200 text/html page of `text` linking to `links`. """
+    anchors = "".join(f'<a href="{link}">link</a>' for link in links)
+    return 200, f"<html><body><p>{text}</p>{anchors}</body></html>", {
+        "Content-Type": "text/html"}
+
+
+def linked_site(hosts, pages_per_host=4):
+    """
+    Pages with 120 distinct words each, on every host, each linking to the
+    next page of its host and to the first page of the next host.
+    """
+    pages = dict()
+    for h, host in enumerate(hosts):
+        for n in range(pages_per_host):
+            words = " ".join(f"w{h}x{n}y{k}" for k in range(120))
+            links = [f"https://{host}/p{(n + 1) % pages_per_host}",
+                     f"https://{hosts[(h + 1) % len(hosts)]}/p0"]
+            pages[f"https://{host}/p{n}"] = html_page(words, links)
+    return pages
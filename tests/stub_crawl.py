@@ -0,0 +1,61 @@
+"""
+Runs a whole crawl in the working directory against a StubCacheServer,
+for tests that need a fresh scraper and download state per crawl:
+
+    python tests/stub_crawl.py pages.json overrides.json requests.json
+
+pages.json maps urls to [status, body, headers]; overrides.json holds config
+overrides by section (see conftest.make_config_parser). The requests the
+stub served are written to requests.json as [url, seconds since start].
+"""
+import json
+import os
+import sys
+import time
+
+sys.path[:0] = [os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                os.path.dirname(os.path.abspath(__file__))]
+
+from conftest import make_config_parser
+from crawler import Crawler
+from crawler.multiproc import ShardProcess, ShardRouter
+from utils.config import Config
+from utils.stub_server import StubCacheServer
+
+
+class TimedRequests(list):
+    """ The stub's request log, with the time of each request. """
+    def __init__(self):
+        super().__init__()
+        self.start = time.monotonic()
+
+    def append(self, request):
+        url, _ = request
+        super().append((url, time.monotonic() - self.start))
+
+
+def main(pages_file, overrides_file, requests_file):
+    with open(pages_file) as file:
+        pages = {
+            url: (status, body.encode(), headers)
+            for url, (status, body, headers) in json.load(file).items()}
+    with open(overrides_file) as file:
+        config = Config(make_config_parser(**json.load(file)))
+    server = StubCacheServer(pages)
+    server.requests = TimedRequests()
+    server.start()
+    config.cache_server = server.address
+    try:
+        if config.crawl_mode == "processes":
+            crawler = Crawler(config, True, ShardRouter, ShardProcess)
+        else:
+            crawler = Crawler(config, True)
+        crawler.start()
+    finally:
+        server.stop()
+    with open(requests_file, "w") as file:
+        json.dump(server.requests, file)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
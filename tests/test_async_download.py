@@ -0,0 +1,29 @@
+from conftest import html_page, linked_site, run_stub_crawl
+
+HOSTS = ["a.ics.uci.edu", "b.ics.uci.edu", "c.ics.uci.edu"]
+
+
+def test_async_engine_fetches_the_same_pages(tmp_path):
+    pages = linked_site(HOSTS)
+    # A broken link and a redirect, which take the error paths.
+    pages["https://a.ics.uci.edu/p0"] = html_page(
+        " ".join(f"seed{k}" for k in range(120)),
+        ["https://a.ics.uci.edu/p1", "https://b.ics.uci.edu/missing",
+         "https://c.ics.uci.edu/moved"])
+    pages["https://c.ics.uci.edu/moved"] = (
+        301, "", {"Location": "https://c.ics.uci.edu/p2"})
+
+    results = dict()
+    for engine in ("sync", "async"):
+        directory = tmp_path / engine
+        directory.mkdir()
+        requests = run_stub_crawl(
+            str(directory), pages, CONNECTION={"ENGINE": engine},
+            **{"LOCAL PROPERTIES": {"THREADCOUNT": 4}})
+        results[engine] = (
+            sorted(url for url, _ in requests), (directory / "report.txt").read_text())
+
+    urls, report = results["sync"]
+    assert "https://b.ics.uci.edu/missing" in urls
+    assert set(urls) >= set(url for url in pages if url.endswith(("p0", "p1", "p2", "p3")))
+    assert results["async"] == (urls, report)
@@ -0,0 +1,14 @@
+import subprocess
+import sys
+
+from conftest import REPO_DIR
+
+
+def test_frontier_does_not_import_the_scraper():
+    # In a fresh interpreter: the test session may have imported it already.
+    result = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, crawler.frontier; "
+         "print(sorted({'scraper', 'crawler.worker', 'utils.download'} & set(sys.modules)))"],
+        cwd=REPO_DIR, capture_output=True, check=True, text=True)
+    assert result.stdout.strip() == "[]"
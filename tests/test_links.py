@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from crawler import links
+from crawler.links import LinkGraph
+
+
+def rank_batches(batches):
+    """ Ranks a graph built batch by batch; returns its CSR and last ranks. """
+    graph = LinkGraph("unused.links")
+    for batch in batches:
+        for source, target in batch:
+            graph.add_link(f"https://a.ics.uci.edu/{source}", f"https://a.ics.uci.edu/{target}")
+        ranks = graph.rank(graph.take_links())
+    return list(graph.row_ptr), list(graph.sources), list(ranks)
+
+
+def test_numpy_and_python_backends_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    rng = random.Random(7)
+    # Nodes are added as the batches go, some are left without outlinks.
+    batches = [
+        [(rng.randrange(size - 20), rng.randrange(size)) for _ in range(3 * size)]
+        for size in (40, 90, 150)]
+
+    row_ptr, sources, ranks = rank_batches(batches)
+    monkeypatch.setattr(links, "numpy", None)
+    python_row_ptr, python_sources, python_ranks = rank_batches(batches)
+
+    assert len(row_ptr) == len(ranks) + 1 > 100
+    assert python_row_ptr == row_ptr
+    assert python_sources == sources
+    assert python_ranks == pytest.approx(ranks, rel=1e-12)
@@ -0,0 +1,60 @@
+from collections import Counter
+
+from conftest import html_page, run_stub_crawl
+from crawler.multiproc import shard_of
+from utils.page_store import PageStore
+from utils.token_store import TokenAggregator
+
+HOSTS = ["a.ics.uci.edu", "b.ics.uci.edu", "c.ics.uci.edu", "d.ics.uci.edu"]
+PAGES_PER_HOST = 3
+TOKENS = 80
+
+
+def counted_site():
+    """
+    Pages linked like conftest.linked_site, whose tokens are all different
+    and repeated 1 to TOKENS times, so the page lengths and word totals
+    have no ties and the report does not depend on the crawl order.
+    """
+    pages = dict()
+    page_count = len(HOSTS) * PAGES_PER_HOST
+    for h, host in enumerate(HOSTS):
+        for n in range(PAGES_PER_HOST):
+            j = h * PAGES_PER_HOST + n
+            words = " ".join(
+                " ".join([f"t{count}x"] * count) for count in range(j + 1, TOKENS + 1, page_count))
+            links = [f"https://{host}/p{(n + 1) % PAGES_PER_HOST}",
+                     f"https://{HOSTS[(h + 1) % len(HOSTS)]}/p0"]
+            pages[f"https://{host}/p{n}"] = html_page(words, links)
+    return pages
+
+
+def crawl_results(directory):
+    """ Page records (without fetch times) and token totals of a crawl. """
+    records = {record[:-1] for record in PageStore(str(directory / "page_records.bin")).records()}
+    tokens = TokenAggregator(
+        str(directory / "token_frequencies.checkpoint.json"),
+        str(directory / "token_frequencies.log"))
+    return (records, dict(tokens.most_common(None)), dict(tokens.most_common(None, True)),
+            (directory / "report.txt").read_text())
+
+
+def test_shards_crawl_each_page_once_and_merge_like_one_process(tmp_path):
+    pages = counted_site()
+    assert {shard_of(url, 2) for url in pages} == {0, 1}
+
+    results = dict()
+    for mode in ("threads", "processes"):
+        directory = tmp_path / mode
+        directory.mkdir()
+        # Returns once the crawl process has exited, which waits for the
+        # shard processes: a hang in the shards' termination fails here.
+        requests = run_stub_crawl(str(directory), pages, **{"LOCAL PROPERTIES": {
+            "MODE": mode, "PROCESSCOUNT": 2, "THREADCOUNT": 2}})
+        assert Counter(url for url, _ in requests) == Counter(list(pages)), mode
+        results[mode] = crawl_results(directory if mode == "threads" else directory / "shards")
+
+    records, totals, totals_stopwords, report = results["threads"]
+    assert len(records) == len(pages)
+    assert totals[f"t{TOKENS}x"] == TOKENS
+    assert results["processes"] == (records, totals, totals_stopwords, report)
@@ -0,0 +1,23 @@
+import pytest
+
+from utils.page_parser import parse_page
+
+TEXT = "Café naïve résumé"
+BACKENDS = ["html.parser", "lxml"]
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("head, encoding, content_type", [
+    ("", "utf-8", None),
+    ("", "iso-8859-1", "text/html; charset=ISO-8859-1"),
+    ('<meta charset="iso-8859-15">', "iso-8859-15", "text/html"),
+    ('<meta http-equiv="Content-Type" content="text/html; charset=windows-1252">',
+     "windows-1252", None),
+    # Not declared and not UTF-8.
+    ("", "windows-1252", None),
+])
+def test_pages_are_decoded_with_their_charset(backend, head, encoding, content_type):
+    if backend == "lxml":
+        pytest.importorskip("lxml")
+    content = f"<html><head>{head}</head><body><p>{TEXT}</p></body></html>".encode(encoding)
+    assert parse_page(content, backend, content_type).words == TEXT.split()
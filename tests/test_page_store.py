@@ -0,0 +1,44 @@
+import os
+
+from utils.page_store import PageStore
+
+LEGACY_FILES = ("all_webpage_count.txt", "all_webpage_count_no_stopwords.txt")
+
+
+def test_imports_legacy_count_files(in_tmp_path):
+    with open(LEGACY_FILES[0], "w") as file:
+        file.write("https://a.ics.uci.edu/x,120\n"
+                   "https://www.a.ics.uci.edu/x,120\n"
+                   "https://b.ics.uci.edu/y?q=1,300\n"
+                   "https://b.ics.uci.edu/z,200\n")
+    # A crash came between the two writes of the last page.
+    with open(LEGACY_FILES[1], "w") as file:
+        file.write("https://a.ics.uci.edu/x,70\n"
+                   "https://www.a.ics.uci.edu/x,70\n"
+                   "https://b.ics.uci.edu/y?q=1,180\n")
+
+    store = PageStore("page_records.bin", legacy_files=LEGACY_FILES)
+    assert [(record.url, record.words, record.words_nostop) for record in store.records()] == [
+        ("https://a.ics.uci.edu/x", 120, 70),
+        ("https://b.ics.uci.edu/y?q=1", 300, 180),
+        ("https://b.ics.uci.edu/z", 200, 0)]
+    assert PageStore("page_records.bin").host_counts() == {
+        "a.ics.uci.edu": 1, "b.ics.uci.edu": 2}
+
+
+def test_drops_a_torn_chunk_on_load(in_tmp_path):
+    store = PageStore("page_records.bin", flush_pages=2)
+    for i in range(5):
+        store.add(f"https://h{i % 2}.ics.uci.edu/p{i}", 100 + i, 50 + i, "ab" * 16)
+    store.close()
+    # The last chunk, one page, is cut off by the crash.
+    os.truncate("page_records.bin", os.path.getsize("page_records.bin") - 3)
+
+    reloaded = PageStore("page_records.bin")
+    assert len(reloaded) == 4
+    assert reloaded.longest(2) == [
+        (103, "https://h1.ics.uci.edu/p3"), (102, "https://h0.ics.uci.edu/p2")]
+    reloaded.add("https://h2.ics.uci.edu/p5", 90, 40)
+    reloaded.close()
+    assert list(PageStore("page_records.bin").urls())[-2:] == [
+        "https://h1.ics.uci.edu/p3", "https://h2.ics.uci.edu/p5"]
@@ -0,0 +1,24 @@
+import time
+
+from crawler.recrawl import PageState
+from crawler.store import SqliteStore
+from utils import get_urlhash
+
+
+def test_only_due_pages_are_queued_again(in_tmp_path):
+    save = SqliteStore("frontier.sqlite")
+    now = time.time()
+    for url, revisit_at in (("https://a.ics.uci.edu/due", now - 1),
+                            ("https://a.ics.uci.edu/later", now + 3600),
+                            ("https://a.ics.uci.edu/not-found", None)):
+        urlhash = get_urlhash(url)
+        save[urlhash] = (url, True, 0)
+        if revisit_at is not None:
+            save.set_page_state(urlhash, PageState(
+                content_hash="0" * 64, checked_at=now - 7200, revisit_at=revisit_at))
+    save[get_urlhash("https://a.ics.uci.edu/new")] = ("https://a.ics.uci.edu/new", False, 1)
+    save.sync(force=True)
+
+    pending = [row for chunk in save.pending(due_before=now) for row in chunk]
+    save.close()
+    assert sorted(pending) == [("https://a.ics.uci.edu/due", 0), ("https://a.ics.uci.edu/new", 1)]
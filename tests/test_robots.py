@@ -0,0 +1,55 @@
+import pytest
+
+from conftest import linked_site, run_stub_crawl
+
+HOSTS = ["a.ics.uci.edu", "b.ics.uci.edu"]
+CRAWL_DELAY = 0.3
+SITEMAP_URL = "https://a.ics.uci.edu/only-in-sitemap"
+
+
+@pytest.fixture(scope="module")
+def requests(tmp_path_factory):
+    """ The requests of one crawl of a site whose robots.txt has rules for a. """
+    pages = linked_site(HOSTS)
+    pages["https://a.ics.uci.edu/robots.txt"] = (200, (
+        "User-agent: *\n"
+        "Disallow: /p2\n"
+        f"Crawl-delay: {CRAWL_DELAY}\n"
+        "Sitemap: https://a.ics.uci.edu/sitemap.xml\n"), {"Content-Type": "text/plain"})
+    pages["https://a.ics.uci.edu/sitemap.xml"] = (200, (
+        '<?xml version="1.0"?>'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        f"<url><loc>{SITEMAP_URL}</loc></url></urlset>"), {"Content-Type": "application/xml"})
+    pages[SITEMAP_URL] = linked_site(["a.ics.uci.edu"], 1)["https://a.ics.uci.edu/p0"]
+    return run_stub_crawl(
+        str(tmp_path_factory.mktemp("robots")), pages,
+        CRAWLER={"SEEDURL": "https://a.ics.uci.edu/p0"}, ROBOTS={"ENABLED": "true"},
+        **{"LOCAL PROPERTIES": {"THREADCOUNT": 3}})
+
+
+def test_robots_txt_is_fetched_once_per_host(requests):
+    urls = [url for url, _ in requests]
+    assert urls.count("https://a.ics.uci.edu/robots.txt") == 1
+    assert urls.count("https://b.ics.uci.edu/robots.txt") == 1
+    assert urls.index("https://a.ics.uci.edu/robots.txt") < urls.index("https://a.ics.uci.edu/p0")
+
+
+def test_disallowed_url_is_never_fetched(requests):
+    urls = [url for url, _ in requests]
+    assert "https://a.ics.uci.edu/p1" in urls
+    assert "https://a.ics.uci.edu/p2" not in urls
+    # Other hosts are not affected by a's rules.
+    assert "https://b.ics.uci.edu/p2" in urls
+
+
+def test_crawl_delay_is_respected(requests):
+    times = [
+        at for url, at in requests
+        if url.startswith("https://a.ics.uci.edu/p") or url == SITEMAP_URL]
+    assert len(times) >= 3
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= CRAWL_DELAY * 0.9
+
+
+def test_sitemap_urls_are_queued(requests):
+    assert SITEMAP_URL in [url for url, _ in requests]
@@ -0,0 +1,40 @@
+import os
+
+from crawler.seen import SeenStore
+from utils import get_urlhash
+
+
+def urlhashes(start, stop):
+    return [get_urlhash(f"https://a.ics.uci.edu/p{i}") for i in range(start, stop)]
+
+
+def test_saved_digests_are_mapped_on_resume(in_tmp_path):
+    seen = SeenStore("frontier.seen", capacity=100, merge_every=16)
+    for urlhash in urlhashes(0, 50):
+        seen.add(urlhash)
+    seen.save(50)
+
+    resumed = SeenStore("frontier.seen", capacity=100, merge_every=16)
+    assert resumed.load(50)
+    assert len(resumed.saved) == 50 and not resumed.sorted
+    for urlhash in urlhashes(50, 300):
+        resumed.add(urlhash)
+    assert all(urlhash in resumed for urlhash in urlhashes(0, 300))
+    assert sum(urlhash in resumed for urlhash in urlhashes(300, 1300)) < 50
+    resumed.save(300)
+    assert len(resumed) == 300
+
+    reloaded = SeenStore("frontier.seen")
+    assert reloaded.load(300)
+    assert all(urlhash in reloaded for urlhash in urlhashes(0, 300))
+
+
+def test_truncated_file_is_not_loaded(in_tmp_path):
+    seen = SeenStore("frontier.seen")
+    for urlhash in urlhashes(0, 50):
+        seen.add(urlhash)
+    seen.save(50)
+    # Cut short by a crash before it reached the disk.
+    os.truncate("frontier.seen", 32 + 8 * 20)
+
+    assert not SeenStore("frontier.seen").load(50)
@@ -0,0 +1,27 @@
+from utils.simhash import SimHashIndex, simhash
+
+
+def test_near_duplicates_are_found_across_restarts(tmp_path):
+    save_file = str(tmp_path / "fingerprints.txt")
+    index = SimHashIndex(save_file, max_distance=3)
+    assert index.find_or_add(0b1011 << 40, "https://a.ics.uci.edu/1") is None
+    assert index.find_or_add((0b1011 << 40) | 0b111, "https://a.ics.uci.edu/2") == (
+        "https://a.ics.uci.edu/1")
+    assert index.find_or_add(0b1111 << 20, "https://a.ics.uci.edu/3") is None
+
+    reloaded = SimHashIndex(save_file, max_distance=3)
+    assert reloaded.find((0b1011 << 40) | 1) == "https://a.ics.uci.edu/1"
+
+
+def test_a_page_is_not_a_duplicate_of_itself(tmp_path):
+    save_file = str(tmp_path / "fingerprints.txt")
+    fingerprint = simhash({"uci": 3, "crawler": 1, "research": 2})
+    SimHashIndex(save_file).find_or_add(fingerprint, "https://a.ics.uci.edu/")
+
+    # Downloaded again after a restart, unchanged or slightly changed.
+    index = SimHashIndex(save_file)
+    assert index.find_or_add(fingerprint, "https://a.ics.uci.edu/") is None
+    assert index.find_or_add(fingerprint ^ 1, "https://a.ics.uci.edu/") is None
+    assert index.find_or_add(fingerprint, "https://b.ics.uci.edu/") == "https://a.ics.uci.edu/"
+    with open(save_file) as file:
+        assert len(file.readlines()) == 2
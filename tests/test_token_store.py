@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import subprocess
+import sys
+import textwrap
+
+from conftest import REPO_DIR
+from utils.page_store import PageStore
+from utils.token_store import TokenAggregator
+from utils.visited import VisitedIndex
+
+PAGES = 10
+
+# Crawls PAGES pages through the frontier and the scraper's tokenizer and is
+# killed before anything is closed, with the last pages' counts and records
+# still buffered (both are flushed every 50 pages).
+CRASHED_CRAWL = textwrap.dedent(f"""
+    import os, sys
+    sys.path[:0] = [{REPO_DIR!r}, {os.path.join(REPO_DIR, "tests")!r}]
+    from conftest import make_config_parser
+    from crawler.frontier import Frontier
+    from utils.config import Config
+    from utils.page_parser import parse_page
+    import scraper
+
+    urls = [f"https://h{{i}}.ics.uci.edu/page" for i in range({PAGES})]
+    config = Config(make_config_parser(
+        CRAWLER={{"SEEDURL": ",".join(urls)}},
+        **{{"LOCAL PROPERTIES": {{"SAVECOMMITOPS": 3, "SAVECOMMITMS": 3600000}}}}))
+    scraper.configure(config)
+    frontier = Frontier(config, True)
+    frontier.add_sync_listener(scraper.flush)
+    for _ in urls:
+        url = frontier.get_tbd_url()
+        host = url.split("//")[1].split(".")[0]
+        scraper.tokenizer(url, parse_page(f"<html><body>{{host}}x {{host}}x crawl</body></html>".encode()))
+        frontier.mark_url_complete(url)
+    os._exit(9)
+""")
+
+
+def test_completed_urls_survive_a_crash(in_tmp_path):
+    result = subprocess.run([sys.executable, "-c", CRASHED_CRAWL], capture_output=True)
+    assert result.returncode == 9, result.stderr.decode()
+
+    conn = sqlite3.connect("frontier.db")
+    completed = [url for (url,) in conn.execute("SELECT url FROM urls WHERE completed = 1")]
+    conn.close()
+    assert 0 < len(completed) < PAGES
+
+    tokens = TokenAggregator("token_frequencies.checkpoint.json", "token_frequencies.log")
+    totals = dict(tokens.most_common(100))
+    for url in completed:
+        host = url.split("//")[1].split(".")[0]
+        assert totals.get(f"{host}x") == 2, url
+    assert totals["crawl"] >= len(completed)
+
+    visited = VisitedIndex(PageStore("page_records.bin"))
+    assert all(url in visited for url in completed)
+
+
+def test_replays_only_flushed_pages(in_tmp_path):
+    tokens = TokenAggregator("tokens.json", "tokens.log", flush_pages=2)
+    tokens.add_page({"a": 1, "the": 1}, {"a": 1})
+    tokens.add_page({"b": 2}, {"b": 2})
+    tokens.add_page({"c": 1}, {"c": 1})
+    # A write torn by the crash.
+    with open("tokens.log", "a") as f:
+        f.write('{"seq": 2, "all": {"d"')
+
+    reloaded = TokenAggregator("tokens.json", "tokens.log")
+    assert dict(reloaded.most_common()) == {"a": 1, "b": 2}
+    assert dict(reloaded.most_common(stopwords=True)) == {"a": 1, "the": 1, "b": 2}
+    reloaded.add_page({"e": 1}, {"e": 1})
+    reloaded.flush()
+    assert dict(TokenAggregator("tokens.json", "tokens.log").most_common()) == {
+        "a": 1, "b": 2, "e": 1}
@@ -1,6 +1,6 @@
 import os
 import logging
-from hashlib import sha256
+from hashlib import blake2b, sha256
 from urllib.parse import urlparse
 
 def get_logger(name, filename=None):
@@ -29,6 +29,10 @@ def get_urlhash(url):
         f"{parsed.netloc}/{parsed.path}/{parsed.params}/"
         f"{parsed.query}/{parsed.fragment}".encode("utf-8")).hexdigest()
 
+def content_hash(content):
+    """ 128 bit hex digest of a page body, to tell whether it changed. """
+    return blake2b(content, digest_size=16).hexdigest()
+
 def normalize(url):
     if url.endswith("/"):
         return url.rstrip("/")
@@ -0,0 +1,67 @@
+import asyncio
+from threading import Thread
+
+import aiohttp
+import cbor
+
+from utils.response import Response
+
+
+class AsyncDownloader(object):
+    """
+    Downloads from the cache server on an asyncio event loop running in a
+    background thread. All requests share one aiohttp session, so
+    connections to the cache server are kept alive and reused, and at most
+    `config.download_concurrency` requests are in flight at once.
+
+    Worker threads call download(), which has the same signature and return
+    value as utils.download.download. Async callers can await fetch() or
+    fetch_many() on the engine's loop directly.
+    """
+    def __init__(self, config):
+        self.config = config
+        self.loop = asyncio.new_event_loop()
+        self.thread = Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.session = asyncio.run_coroutine_threadsafe(
+            self._open(), self.loop).result()
+
+    async def _open(self):
+        self.semaphore = asyncio.Semaphore(self.config.download_concurrency)
+        connector = aiohttp.TCPConnector(
+            limit=self.config.download_concurrency, keepalive_timeout=60)
+        return aiohttp.ClientSession(connector=connector)
+
+    async def fetch(self, url, logger=None):
+        host, port = self.config.cache_server
+        async with self.semaphore:
+            async with self.session.get(
+                    f"http://{host}:{port}/",
+                    params=[("q", f"{url}"), ("u", f"{self.config.user_agent}")]) as resp:
+                content = await resp.read()
+                status = resp.status
+        try:
+            if status < 400 and content:
+                return Response(cbor.loads(content))
+        except (EOFError, ValueError):
+            pass
+        if logger:
+            logger.error(f"Spacetime Response error <{status}> with url {url}.")
+        return Response({
+            "error": f"Spacetime Response error <{status}> with url {url}.",
+            "status": status,
+            "url": url})
+
+    async def fetch_many(self, urls, logger=None):
+        return await asyncio.gather(*(self.fetch(url, logger) for url in urls))
+
+    def download(self, url, config=None, logger=None):
+        """ Blocking download for worker threads. """
+        return asyncio.run_coroutine_threadsafe(
+            self.fetch(url, logger), self.loop).result()
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(
+            self.session.close(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
@@ -1,3 +1,4 @@
+import os
 import re
 
 
@@ -8,12 +9,80 @@ class Config(object):
         assert self.user_agent != "DEFAULT AGENT", "Set useragent in config.ini"
         assert re.match(r"^[a-zA-Z0-9_ ,]+$", self.user_agent), "User agent should not have any special characters outside '_', ',' and 'space'"
         self.threads_count = int(config["LOCAL PROPERTIES"]["THREADCOUNT"])
+        self.crawl_mode = config["LOCAL PROPERTIES"].get("MODE", "threads")
+        self.process_count = config["LOCAL PROPERTIES"].getint("PROCESSCOUNT", 4)
+        self.shard_dir = config["LOCAL PROPERTIES"].get("SHARDDIR", "shards")
         self.save_file = config["LOCAL PROPERTIES"]["SAVE"]
+        self.save_backend = config["LOCAL PROPERTIES"].get("SAVEBACKEND", "sqlite")
+        self.save_commit_ops = config["LOCAL PROPERTIES"].getint("SAVECOMMITOPS", 500)
+        self.save_commit_ms = config["LOCAL PROPERTIES"].getint("SAVECOMMITMS", 1000)
+        # Port of the /metrics endpoint (0 turns it off) and shutdown dump.
+        self.metrics_port = config["LOCAL PROPERTIES"].getint("METRICSPORT", 0)
+        self.metrics_file = config["LOCAL PROPERTIES"].get("METRICSFILE", "metrics.txt")
 
         self.host = config["CONNECTION"]["HOST"]
         self.port = int(config["CONNECTION"]["PORT"])
+        self.download_engine = config["CONNECTION"].get("ENGINE", "sync")
+        self.download_concurrency = config["CONNECTION"].getint("CONCURRENCY", 16)
+        # off, record (store every response) or replay (read them back).
+        self.record_mode = config["CONNECTION"].get("RECORDMODE", "off")
+        # Absolute, since shard processes run in their own directories.
+        self.record_dir = os.path.abspath(
+            config["CONNECTION"].get("RECORDDIR", "recorded"))
 
         self.seed_urls = config["CRAWLER"]["SEEDURL"].split(",")
         self.time_delay = float(config["CRAWLER"]["POLITENESS"])
+        # Scoring function of the frontier queues, see crawler/priority.py.
+        self.priority = config["CRAWLER"].get("PRIORITY", "balanced")
+        # Pages whose SimHash differs in at most this many bits are duplicates.
+        self.near_duplicate_bits = config["CRAWLER"].getint("NEARDUPLICATEBITS", 3)
+        # Larger pages are truncated (or skipped, OVERSIZE = skip) before
+        # parsing; at most MAXPAGETOKENS words of a page are counted.
+        self.max_page_bytes = config["CRAWLER"].getint("MAXPAGEBYTES", 5000000)
+        self.max_page_tokens = config["CRAWLER"].getint("MAXPAGETOKENS", 500000)
+        self.oversize_policy = config["CRAWLER"].get("OVERSIZE", "truncate")
+        # Token normalization of utils/tokenizer.py.
+        self.strip_punctuation = config["CRAWLER"].getboolean("STRIPPUNCTUATION", True)
+        self.drop_numbers = config["CRAWLER"].getboolean("DROPNUMBERS", False)
+
+        # Thresholds of the crawler trap detector in crawler/traps.py.
+        self.trap_max_depth = config.getint("TRAPS", "MAXDEPTH", fallback=12)
+        self.trap_max_repeats = config.getint("TRAPS", "MAXREPEATS", fallback=3)
+        self.trap_max_query_values = config.getint("TRAPS", "MAXQUERYVALUES", fallback=500)
+        self.trap_min_pages = config.getint("TRAPS", "MINPAGES", fallback=20)
+        self.trap_throttle_ratio = config.getfloat("TRAPS", "THROTTLERATIO", fallback=0.5)
+        self.trap_block_ratio = config.getfloat("TRAPS", "BLOCKRATIO", fallback=0.8)
+        self.trap_throttle_every = config.getint("TRAPS", "THROTTLEEVERY", fallback=10)
+        self.trap_export_file = config.get("TRAPS", "EXPORT", fallback="blocked_patterns.txt")
+
+        # Adaptive per host delays and retries in crawler/rate.py.
+        self.rate_alpha = config.getfloat("RATE", "ALPHA", fallback=0.3)
+        self.rate_latency_factor = config.getfloat("RATE", "LATENCYFACTOR", fallback=2.0)
+        self.rate_backoff_base = config.getfloat("RATE", "BACKOFFBASE", fallback=1.0)
+        self.rate_max_backoff = config.getfloat("RATE", "MAXBACKOFF", fallback=300.0)
+        self.rate_max_retries = config.getint("RATE", "MAXRETRIES", fallback=3)
+        self.rate_retry_penalty = config.getfloat("RATE", "RETRYPENALTY", fallback=5.0)
+
+        # robots.txt and sitemap handling in crawler/robots.py.
+        self.robots_enabled = config.getboolean("ROBOTS", "ENABLED", fallback=True)
+        self.robots_ttl = config.getint("ROBOTS", "TTL", fallback=86400)
+        self.robots_error_ttl = config.getint("ROBOTS", "ERRORTTL", fallback=600)
+        self.robots_max_delay = config.getfloat("ROBOTS", "MAXCRAWLDELAY", fallback=30.0)
+        self.sitemap_max_urls = config.getint("ROBOTS", "SITEMAPMAXURLS", fallback=1000)
+
+        # Re-crawls of downloaded pages (launch.py --recrawl), crawler/recrawl.py.
+        self.recrawl = config.getboolean("RECRAWL", "ENABLED", fallback=False)
+        self.recrawl_initial = config.getfloat("RECRAWL", "INITIAL", fallback=86400.0)
+        self.recrawl_min_interval = config.getfloat("RECRAWL", "MININTERVAL", fallback=3600.0)
+        self.recrawl_max_interval = config.getfloat("RECRAWL", "MAXINTERVAL", fallback=2592000.0)
+
+        # Link graph and PageRank in crawler/links.py.
+        self.links_enabled = config.getboolean("LINKS", "ENABLED", fallback=False)
+        self.links_rank_every = config.getint("LINKS", "RANKEVERY", fallback=100000)
+        self.links_damping = config.getfloat("LINKS", "DAMPING", fallback=0.85)
+        self.links_iterations = config.getint("LINKS", "ITERATIONS", fallback=30)
+
+        # Overrides for the url filter rules in utils/url_filter.py.
+        self.filter_rules = dict(config["FILTER"]) if config.has_section("FILTER") else dict()
 
         self.cache_server = None
\ No newline at end of file
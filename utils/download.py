@@ -1,12 +1,24 @@
 import requests
 import cbor
 import time
+from threading import local
 
 from utils.response import Response
 
+# One pooled keep-alive session per worker thread.
+_sessions = local()
+
+
+def _get_session():
+    session = getattr(_sessions, "session", None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
 def download(url, config, logger=None):
     host, port = config.cache_server
-    resp = requests.get(
+    resp = _get_session().get(
         f"http://{host}:{port}/",
         params=[("q", f"{url}"), ("u", f"{config.user_agent}")])
     try:
@@ -14,8 +26,49 @@ def download(url, config, logger=None):
             return Response(cbor.loads(resp.content))
     except (EOFError, ValueError) as e:
         pass
-    logger.error(f"Spacetime Response error {resp} with url {url}.")
+    if logger:
+        logger.error(f"Spacetime Response error {resp} with url {url}.")
     return Response({
         "error": f"Spacetime Response error {resp} with url {url}.",
         "status": resp.status_code,
         "url": url})
+
+
+_async_engine = None
+_response_cache = None
+
+
+def get_download(config):
+    """
+    Returns the download function for the engine selected by ENGINE in
+    config: the blocking requests based download, or the asyncio engine
+    shared by all workers with a pooled connection to the cache server.
+    With RECORDMODE = record its responses are also stored in RECORDDIR;
+    with RECORDMODE = replay they are read from there instead.
+    """
+    global _async_engine, _response_cache
+    if config.record_mode in ("record", "replay") and _response_cache is None:
+        from utils.response_cache import ResponseCache
+        _response_cache = ResponseCache(config.record_dir)
+    if config.record_mode == "replay":
+        return _response_cache.download
+    if config.download_engine != "async":
+        engine = download
+    else:
+        if _async_engine is None:
+            from utils.async_download import AsyncDownloader
+            _async_engine = AsyncDownloader(config)
+        engine = _async_engine.download
+    if config.record_mode == "record":
+        return _response_cache.recorder(engine)
+    return engine
+
+
+def close_download():
+    global _async_engine, _response_cache
+    if _async_engine is not None:
+        _async_engine.close()
+        _async_engine = None
+    if _response_cache is not None:
+        _response_cache.close()
+        _response_cache = None
@@ -0,0 +1,158 @@
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+
+
+class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
+    """ http.server.ThreadingHTTPServer, which Python 3.6 does not have. """
+    daemon_threads = True
+
+
+def _escape(label):
+    return str(label).replace("\\", "\\\\").replace('"', '\\"')
+
+
+class _Timer(object):
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+class Metrics(object):
+    """
+    Counters, per-stage timers and gauges of a running crawl.
+
+    Recording is a dict update under one lock, a microsecond or two, which
+    is negligible next to a page download, so the instrumentation stays on.
+    Gauges that are expensive or owned by another object, like the
+    frontier size, are registered as collectors: functions returning
+    (name, labels, value) tuples that are only called when the metrics are
+    rendered. render() produces the Prometheus text format, which serve()
+    exposes at http://localhost:<port>/metrics and dump() writes to a file.
+    """
+    def __init__(self, prefix="crawler"):
+        self.prefix = prefix
+        self.lock = Lock()
+        self.started = time.monotonic()
+        # (name, labels) -> value; labels is a sorted tuple of pairs.
+        self.counters = dict()
+        self.gauges = dict()
+        # stage -> [count, total seconds, max seconds]
+        self.timings = dict()
+        self.collectors = list()
+        self.server = None
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())) if labels else ())
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            timing = self.timings.get(stage)
+            if timing is None:
+                self.timings[stage] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                if seconds > timing[2]:
+                    timing[2] = seconds
+
+    def timer(self, stage):
+        """ Context manager adding the time spent in its block to stage. """
+        return _Timer(self, stage)
+
+    def add_collector(self, collector):
+        self.collectors.append(collector)
+
+    def _line(self, name, labels, value):
+        if labels:
+            label_text = ",".join(
+                f'{key}="{_escape(label)}"' for key, label in labels)
+            return f"{self.prefix}_{name}{{{label_text}}} {value}"
+        return f"{self.prefix}_{name} {value}"
+
+    def render(self):
+        uptime = time.monotonic() - self.started
+        with self.lock:
+            counters = sorted(self.counters.items())
+            gauges = dict(self.gauges)
+            timings = sorted((stage, list(timing)) for stage, timing in self.timings.items())
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                gauges[(name, tuple(sorted(labels.items())))] = value
+        gauges[("uptime_seconds", ())] = round(uptime, 3)
+        gauges[("pages_per_second", ())] = round(
+            sum(value for (name, _), value in counters if name == "pages_total")
+            / max(uptime, 1e-9), 3)
+
+        lines = list()
+        typed = set()
+        for kind, items in (("counter", counters), ("gauge", sorted(gauges.items()))):
+            for (name, labels), value in items:
+                if name not in typed:
+                    lines.append(f"# TYPE {self.prefix}_{name} {kind}")
+                    typed.add(name)
+                lines.append(self._line(name, labels, value))
+        if timings:
+            lines.append(f"# TYPE {self.prefix}_stage_seconds summary")
+            for stage, (count, total, _) in timings:
+                labels = (("stage", stage),)
+                lines.append(self._line("stage_seconds_count", labels, count))
+                lines.append(self._line("stage_seconds_sum", labels, round(total, 6)))
+            lines.append(f"# TYPE {self.prefix}_stage_seconds_max gauge")
+            for stage, (_, _, longest) in timings:
+                lines.append(self._line(
+                    "stage_seconds_max", (("stage", stage),), round(longest, 6)))
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        with open(path, "w") as file:
+            file.write(self.render())
+
+    def serve(self, port, host="127.0.0.1"):
+        """ Serves render() over HTTP from a background thread. """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadedHTTPServer((host, port), Handler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+# Shared by the crawler's modules; each crawl process has its own.
+metrics = Metrics()
@@ -0,0 +1,195 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from itertools import islice
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# Text inside these tags is not page content (BeautifulSoup's get_text skips
+# them as well).
+SKIPPED_TAGS = {"script", "style", "template"}
+# Text nodes longer than this are split into words lazily, so one huge node
+# (e.g. a plain text word list) is never turned into a list of all its words.
+LAZY_SPLIT_CHARS = 1 << 16
+WORD = re.compile(r"\S+")
+# Charset declarations: in a Content-Type header, and in a <meta charset> or
+# <meta http-equiv="Content-Type"> tag, which must be in the first 1024 bytes.
+HEADER_CHARSET = re.compile(r"""charset\s*=\s*["']?\s*([-\w.:]+)""", re.IGNORECASE)
+META_CHARSET = re.compile(
+    rb"""<meta[^>]*?charset\s*=\s*["']?\s*([-\w.:]+)""", re.IGNORECASE)
+META_SNIFF_BYTES = 1024
+
+
+def _codec(charset):
+    try:
+        return codecs.lookup(charset).name
+    except LookupError:
+        return None
+
+
+def find_encoding(content, content_type=None):
+    """
+    The encoding declared for html bytes by the charset of their
+    Content-Type header, else by a <meta> tag; None if neither declares
+    one that Python knows.
+    """
+    match = HEADER_CHARSET.search(content_type or "")
+    encoding = match and _codec(match.group(1))
+    if not encoding:
+        match = META_CHARSET.search(content, 0, META_SNIFF_BYTES)
+        encoding = match and _codec(match.group(1).decode("ascii"))
+        # A <meta> tag read as ASCII cannot be UTF-16 or UTF-32; browsers
+        # take it as UTF-8.
+        if encoding and encoding.startswith(("utf-16", "utf-32")):
+            encoding = "utf-8"
+    return encoding or None
+
+
+def decode_html(content, content_type=None):
+    """
+    Decodes html bytes with their declared encoding (see find_encoding),
+    else as UTF-8, else as windows-1252, which browsers assume for
+    undeclared pages that are not UTF-8.
+    """
+    encoding = find_encoding(content, content_type)
+    if encoding:
+        return content.decode(encoding, errors="replace")
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError:
+        return content.decode("windows-1252", errors="replace")
+
+
+class ParsedPage(object):
+    """
+    Everything the scraper needs from one html page, collected in a single
+    pass over the document.
+        text: the visible text nodes, in document order.
+        hrefs: the href of every <a> tag that has one, in document order.
+        robots: the lowercased directives of the first robots meta tag.
+    The words of the text (split on whitespace) are generated by
+    iter_words(); `words` builds the full list.
+    """
+    def __init__(self, text, hrefs, robots):
+        self.text = text
+        self.hrefs = hrefs
+        self.robots = robots
+
+    def _words(self):
+        for node in self.text:
+            if len(node) > LAZY_SPLIT_CHARS:
+                for match in WORD.finditer(node):
+                    yield match.group()
+            else:
+                yield from node.split()
+
+    def iter_words(self, limit=None):
+        """ Generates the page's words, at most limit of them. """
+        return islice(self._words(), limit)
+
+    @property
+    def words(self):
+        return list(self._words())
+
+
+class _PageCollector(object):
+    """ Parser target that builds a ParsedPage from start/end/data events. """
+    def __init__(self):
+        self.text = list()
+        # Data events between two tags belong to one text node.
+        self.node = list()
+        self.hrefs = list()
+        self.robots = None
+        self.skip_depth = 0
+
+    def _end_node(self):
+        if self.node:
+            self.text.append("".join(self.node))
+            self.node = list()
+
+    def start(self, tag, attrs):
+        self._end_node()
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag == "a":
+            href = attrs.get("href")
+            if href is not None:
+                self.hrefs.append(href)
+        elif tag == "meta" and self.robots is None:
+            if (attrs.get("name") or "").lower() == "robots":
+                content = (attrs.get("content") or "").lower()
+                self.robots = {
+                    directive.strip() for directive in content.split(",")}
+
+    def end(self, tag):
+        self._end_node()
+        if tag in SKIPPED_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+
+    def data(self, data):
+        if not self.skip_depth:
+            self.node.append(data)
+
+    def comment(self, text):
+        self._end_node()
+
+    def close(self):
+        self._end_node()
+        return ParsedPage(self.text, self.hrefs, self.robots or set())
+
+
+class _StdlibParser(HTMLParser):
+    """ Feeds html.parser events to a _PageCollector. """
+    def __init__(self, collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, dict(attrs))
+        self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+    def handle_comment(self, data):
+        self.collector.comment(data)
+
+
+def _parse_lxml(content):
+    parser = etree.HTMLParser(target=_PageCollector())
+    parser.feed(content)
+    return parser.close()
+
+
+def _parse_stdlib(content):
+    collector = _PageCollector()
+    parser = _StdlibParser(collector)
+    parser.feed(content)
+    parser.close()
+    return collector.close()
+
+
+def parse_page(content, backend=None, content_type=None):
+    """
+    Parses html content (bytes or str) into a ParsedPage in one pass.
+    Uses lxml when it is installed and html.parser otherwise; backend can
+    be "lxml" or "html.parser" to force one. Bytes are decoded first with
+    decode_html, given the page's Content-Type header if there is one, so
+    both backends see the same text.
+    """
+    if isinstance(content, bytes):
+        content = decode_html(content, content_type)
+    if backend is None:
+        backend = "lxml" if etree is not None else "html.parser"
+    if backend == "lxml":
+        return _parse_lxml(content)
+    return _parse_stdlib(content)
@@ -0,0 +1,315 @@
+import heapq
+import os
+import struct
+import time
+import zlib
+from array import array
+from collections import Counter, namedtuple
+from threading import RLock
+from urllib.parse import urlparse
+
+# Each chunk starts with: format word, rows, hosts first seen in the chunk,
+# compressed size of the host names and of the urls, crc32 of the body.
+CHUNK_HEADER = struct.Struct("<QIIIII")
+CHUNK_FORMAT = 0x5041474553000001
+# Numeric columns in the order they are stored in a chunk.
+COLUMNS = (
+    ("host_id", "I"), ("words", "I"), ("words_nostop", "I"), ("status", "H"),
+    ("fetched_at", "d"))
+HASH_BYTES = 16
+ITEM_BYTES = [array(typecode).itemsize for _, typecode in COLUMNS]
+# Bytes of one row in the columns and hashes of a chunk.
+ROW_BYTES = sum(ITEM_BYTES) + HASH_BYTES
+# Rows per chunk when older count files are imported.
+IMPORT_CHUNK_ROWS = 10000
+
+PageRecord = namedtuple(
+    "PageRecord", "url host words words_nostop content_hash status fetched_at")
+
+
+def read_count_file(count_file):
+    """ Streams the "url,count" lines of a legacy page count file. """
+    with open(count_file, "r") as file:
+        for line in file:
+            url, _, count = line.rstrip("\n").rpartition(",")
+            if url:
+                yield url, int(count)
+
+
+class Chunk(object):
+    """ A chunk's header fields and body, decoded column by column. """
+    def __init__(self, first_id, rows, new_hosts, hosts_size, urls_size, body):
+        self.first_id = first_id
+        self.rows = rows
+        self.new_hosts = new_hosts
+        self.hosts_size = hosts_size
+        self.urls_size = urls_size
+        self.body = body
+
+    def column(self, name):
+        offset = 0
+        for (column, typecode), item_bytes in zip(COLUMNS, ITEM_BYTES):
+            size = item_bytes * self.rows
+            if column == name:
+                values = array(typecode)
+                values.frombytes(self.body[offset:offset + size])
+                return values
+            offset += size
+        raise KeyError(name)
+
+    def content_hashes(self):
+        offset = (ROW_BYTES - HASH_BYTES) * self.rows
+        hashes = self.body[offset:offset + HASH_BYTES * self.rows]
+        unknown = bytes(HASH_BYTES)
+        return [
+            None if hashes[i:i + HASH_BYTES] == unknown else hashes[i:i + HASH_BYTES].hex()
+            for i in range(0, len(hashes), HASH_BYTES)]
+
+    def hosts(self):
+        if not self.new_hosts:
+            return list()
+        offset = ROW_BYTES * self.rows
+        block = zlib.decompress(self.body[offset:offset + self.hosts_size])
+        return block.decode("utf-8").split("\n")
+
+    def urls(self):
+        offset = ROW_BYTES * self.rows + self.hosts_size
+        block = zlib.decompress(self.body[offset:offset + self.urls_size])
+        return block.decode("utf-8").split("\n")
+
+
+class PageStore(object):
+    """
+    One record per scraped page: url, host, word counts with and without
+    stopwords, content hash, status and fetch time. The url id of a page
+    is its row number, its host id an index into the host names.
+
+    Records are buffered and appended to `path` in chunks of up to
+    `flush_pages` pages, or after `flush_seconds`, and whenever flush() is
+    called: the scraper flushes before the frontier commits urls as
+    complete, so no completed page is missing a record. A chunk stores each
+    numeric column as a packed array, the content hashes as 16 raw bytes
+    each, and the host names first seen in it and its urls as two zlib
+    blocks, since urls share long prefixes. Scans read only the columns
+    they ask for, so counting pages per host or finding the longest pages
+    never decodes a url it does not return. A torn chunk at the end of the
+    file (crc mismatch) is dropped when the store is loaded.
+
+    Urls and host names cannot contain newlines (urllib strips them), so
+    the string blocks are newline separated. With `legacy_files`, the
+    (all words, no stopwords) "url,count" files written by older versions
+    of the scraper are imported when `path` does not exist yet.
+    """
+    def __init__(self, path, flush_pages=50, flush_seconds=30.0, legacy_files=None):
+        self.path = path
+        self.flush_pages = flush_pages
+        self.flush_seconds = flush_seconds
+        self.legacy_files = legacy_files
+        self._lock = RLock()
+        self._loaded = False
+
+    def _load(self):
+        self.hosts = list()
+        self.host_ids = dict()
+        self.count = 0
+        self._pending = list()
+        self._pending_hosts = list()
+        self._last_flush = time.monotonic()
+
+        if os.path.exists(self.path):
+            good_bytes = 0
+            for chunk, end in self._read_chunks(os.path.getsize(self.path), verify=True):
+                for host in chunk.hosts():
+                    self.host_ids[host] = len(self.hosts)
+                    self.hosts.append(host)
+                self.count += chunk.rows
+                good_bytes = end
+            os.truncate(self.path, good_bytes)
+        self._loaded = True
+        if not self.count and self.legacy_files and os.path.exists(self.legacy_files[0]):
+            self._import_legacy()
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def _import_legacy(self):
+        """
+        Streams the two count files in step: the scraper wrote each page's
+        line to both, so the no-stopword count of a page is on the same line
+        of the second file unless a crash came between the two writes.
+        """
+        from utils.visited import canonicalize
+        nostop = iter(())
+        if os.path.exists(self.legacy_files[1]):
+            nostop = read_count_file(self.legacy_files[1])
+        next_nostop = next(nostop, None)
+        seen = set()
+        for url, words in read_count_file(self.legacy_files[0]):
+            words_nostop = 0
+            if next_nostop is not None and next_nostop[0] == url:
+                words_nostop = next_nostop[1]
+                next_nostop = next(nostop, None)
+            canonical = canonicalize(url)
+            if canonical not in seen:
+                seen.add(canonical)
+                self._append(url, words, words_nostop, None, 200, 0.0)
+                if len(self._pending) >= IMPORT_CHUNK_ROWS:
+                    self.flush()
+        self.flush()
+
+    def _read_chunks(self, end, verify=False):
+        """
+        Yields (chunk, offset after it) for the complete chunks before end.
+        With verify the crc of each chunk is checked, which load does once
+        for the whole file.
+        """
+        if not end:
+            return
+        with open(self.path, "rb") as file:
+            offset = 0
+            first_id = 0
+            while offset + CHUNK_HEADER.size <= end:
+                magic, rows, new_hosts, hosts_size, urls_size, crc = CHUNK_HEADER.unpack(
+                    file.read(CHUNK_HEADER.size))
+                if magic != CHUNK_FORMAT:
+                    return
+                body_size = ROW_BYTES * rows + hosts_size + urls_size
+                offset += CHUNK_HEADER.size + body_size
+                if offset > end:
+                    return
+                body = file.read(body_size)
+                if verify and zlib.crc32(body) != crc:
+                    return
+                yield Chunk(first_id, rows, new_hosts, hosts_size, urls_size, body), offset
+                first_id += rows
+
+    def __len__(self):
+        self._ensure_loaded()
+        return self.count
+
+    def add(self, url, words, words_nostop, content_hash=None, status=200, fetched_at=None):
+        """ Records a page and returns its url id. """
+        self._ensure_loaded()
+        with self._lock:
+            url_id = self._append(
+                url, words, words_nostop, content_hash, status,
+                time.time() if fetched_at is None else fetched_at)
+            if (len(self._pending) >= self.flush_pages
+                    or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self.flush()
+            return url_id
+
+    def _append(self, url, words, words_nostop, content_hash, status, fetched_at):
+        host = urlparse(url).hostname or ""
+        host_id = self.host_ids.get(host)
+        if host_id is None:
+            host_id = self.host_ids[host] = len(self.hosts)
+            self.hosts.append(host)
+            self._pending_hosts.append(host)
+        digest = bytes.fromhex(content_hash) if content_hash else bytes(HASH_BYTES)
+        self._pending.append((
+            url, host_id, words, words_nostop, status, fetched_at, digest))
+        self.count += 1
+        return self.count - 1
+
+    def flush(self):
+        """ Appends the buffered records to the file as one chunk. """
+        self._ensure_loaded()
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending:
+                return
+            rows = self._pending
+            columns = [
+                array(typecode, [row[i] for row in rows]).tobytes()
+                for i, (_, typecode) in enumerate(COLUMNS, 1)]
+            hosts = zlib.compress("\n".join(self._pending_hosts).encode("utf-8"))
+            urls = zlib.compress("\n".join(row[0] for row in rows).encode("utf-8"))
+            body = b"".join(columns + [row[6] for row in rows] + [hosts, urls])
+            with open(self.path, "ab") as f:
+                f.write(CHUNK_HEADER.pack(
+                    CHUNK_FORMAT, len(rows), len(self._pending_hosts), len(hosts),
+                    len(urls), zlib.crc32(body)))
+                f.write(body)
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = list()
+            self._pending_hosts = list()
+
+    def close(self):
+        if self._loaded:
+            self.flush()
+
+    def _snapshot(self):
+        """ Flushes and returns (host names, file size) to scan up to. """
+        self._ensure_loaded()
+        with self._lock:
+            self.flush()
+            end = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            return list(self.hosts), end
+
+    def scan(self, *columns):
+        """
+        Yields one dict per chunk with the requested columns: "url_id",
+        "url", "host", "host_id", "words", "words_nostop", "content_hash",
+        "status" or "fetched_at". Buffered records are flushed first.
+        """
+        hosts, end = self._snapshot()
+        for chunk, _ in self._read_chunks(end):
+            values = dict()
+            for name in columns:
+                if name == "url_id":
+                    values[name] = range(chunk.first_id, chunk.first_id + chunk.rows)
+                elif name == "url":
+                    values[name] = chunk.urls()
+                elif name == "host":
+                    values[name] = [hosts[host_id] for host_id in chunk.column("host_id")]
+                elif name == "content_hash":
+                    values[name] = chunk.content_hashes()
+                else:
+                    values[name] = chunk.column(name)
+            yield values
+
+    def urls(self):
+        for values in self.scan("url"):
+            yield from values["url"]
+
+    def records(self):
+        """ Every page as a PageRecord, in the order they were added. """
+        names = PageRecord._fields
+        for values in self.scan(*names):
+            yield from map(PageRecord, *(values[name] for name in names))
+
+    def host_counts(self):
+        """ Counter of pages per host name. """
+        counts = Counter()
+        for values in self.scan("host_id"):
+            counts.update(values["host_id"])
+        with self._lock:
+            return Counter({self.hosts[host_id]: count for host_id, count in counts.items()})
+
+    def longest(self, n=10):
+        """
+        The n pages with the most words, as (words, url), longest first;
+        earlier pages first among pages of the same length.
+        """
+        top = list()
+        for values in self.scan("url_id", "words"):
+            top = heapq.nlargest(
+                n, top + list(zip(values["words"], values["url_id"])),
+                key=lambda page: (page[0], -page[1]))
+        urls = self.get_urls({url_id for _, url_id in top})
+        return [(words, urls[url_id]) for words, url_id in top]
+
+    def get_urls(self, url_ids):
+        """ {url id: url} for the given ids, decoding only their chunks. """
+        _, end = self._snapshot()
+        urls = dict()
+        for chunk, _ in self._read_chunks(end):
+            ids = range(chunk.first_id, chunk.first_id + chunk.rows)
+            if any(url_id in ids for url_id in url_ids):
+                urls.update(zip(ids, chunk.urls()))
+        return urls
@@ -0,0 +1,197 @@
+import heapq
+import json
+import os
+import re
+from argparse import ArgumentParser
+from collections import Counter
+from threading import RLock
+from urllib.parse import urlparse
+
+from utils.page_store import PageStore
+
+SUBDOMAIN_SUFFIX = "ics.uci.edu"
+
+
+class TopK(object):
+    """
+    The k largest counts of a set of words whose counts only grow.
+
+    update() is given a word's new total. Because totals never decrease, a
+    word outside the top k can only enter by passing the smallest member,
+    so a dict of the members plus a min-heap with lazily discarded stale
+    entries keeps the top k exact at O(log k) per update.
+    """
+    def __init__(self, k):
+        self.k = k
+        self.members = dict()
+        self.heap = list()
+
+    def _drop_stale(self):
+        while self.heap and self.members.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
+
+    def update(self, word, count):
+        if word in self.members:
+            if count <= self.members[word]:
+                return
+        elif len(self.members) >= self.k:
+            self._drop_stale()
+            if count <= self.heap[0][0]:
+                return
+            _, smallest = heapq.heappop(self.heap)
+            del self.members[smallest]
+        self.members[word] = count
+        heapq.heappush(self.heap, (count, word))
+        if len(self.heap) > 4 * self.k:
+            self.heap = [(c, w) for w, c in self.members.items()]
+            heapq.heapify(self.heap)
+
+    def most_common(self):
+        return sorted(self.members.items(), key=lambda item: (-item[1], item[0]))
+
+
+def get_subdomain(url):
+    return get_host_subdomain(urlparse(url).hostname or "")
+
+
+def get_host_subdomain(hostname):
+    if hostname.startswith("www."):
+        hostname = hostname[4:]
+    if hostname == SUBDOMAIN_SUFFIX or hostname.endswith("." + SUBDOMAIN_SUFFIX):
+        return hostname
+    return None
+
+
+class CrawlReport(object):
+    """
+    The statistics of valid_report.txt kept up to date as pages are
+    recorded: number of unique pages, the longest pages (bounded min-heap),
+    pages per ics.uci.edu subdomain and the top words (TopK fed with the
+    running totals). render() produces the report in O(k) at any time.
+    """
+    def __init__(self, top_words=50, longest_pages=10):
+        self.unique_pages = 0
+        self.longest = list()
+        self.longest_pages = longest_pages
+        self.subdomains = Counter()
+        self.top_words = TopK(top_words)
+        self._lock = RLock()
+
+    def _add_longest(self, words, url):
+        if len(self.longest) < self.longest_pages:
+            heapq.heappush(self.longest, (words, url))
+        elif words > self.longest[0][0]:
+            heapq.heapreplace(self.longest, (words, url))
+
+    def add_page(self, url, words):
+        with self._lock:
+            self.unique_pages += 1
+            self._add_longest(words, url)
+            subdomain = get_subdomain(url)
+            if subdomain:
+                self.subdomains[subdomain] += 1
+
+    def add_pages(self, pages):
+        """
+        Adds every page of a PageStore from its word and host columns; only
+        the urls of the longest pages are decoded.
+        """
+        with self._lock:
+            self.unique_pages += len(pages)
+            for words, url in pages.longest(self.longest_pages):
+                self._add_longest(words, url)
+            for host, count in pages.host_counts().items():
+                subdomain = get_host_subdomain(host)
+                if subdomain:
+                    self.subdomains[subdomain] += count
+
+    def update_words(self, totals):
+        """ Feeds (word, new total count) pairs to the top words. """
+        with self._lock:
+            for word, count in totals:
+                self.top_words.update(word, count)
+
+    def render(self):
+        with self._lock:
+            lines = [f"Number of Unique Pages: {self.unique_pages} "]
+            if self.longest:
+                words, url = max(self.longest)
+                page = url.split("://", 1)[-1]
+                lines.append(f"Longest Page: {page}, {words} words")
+            top = [word for word, _ in self.top_words.most_common()]
+            lines.append(
+                f"Top {self.top_words.k} Most Common Words: {', '.join(top)}")
+            lines.append(f"Number of ICS Subdomains: {len(self.subdomains)}")
+            for subdomain, count in sorted(self.subdomains.items()):
+                lines.append(f"{subdomain} : {count}")
+            return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        with open(path, "w") as file:
+            file.write(self.render())
+
+
+_JSON_ITEM = re.compile(r'\s*[{,]\s*"((?:[^"\\]|\\.)*)"\s*:\s*(-?\d+)')
+
+
+def read_json_counts(json_file, chunk_size=1 << 16):
+    """
+    Streams the items of a flat {"token": count} json file without loading
+    the whole document.
+    """
+    with open(json_file, "r") as file:
+        buffer = ""
+        position = 0
+        eof = False
+        while True:
+            match = _JSON_ITEM.match(buffer, position)
+            # A match that reaches the end of the buffer may be cut short.
+            if match and (eof or match.end() < len(buffer)):
+                yield json.loads(f'"{match.group(1)}"'), int(match.group(2))
+                position = match.end()
+                continue
+            if eof:
+                return
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+
+
+def load_report(pages, aggregator=None, legacy_json=None, top_words=50):
+    """
+    Builds a CrawlReport from column scans of a PageStore and the token
+    totals: the aggregator's when given, else a legacy
+    token_frequencies_nostop.json.
+    """
+    report = CrawlReport(top_words)
+    report.add_pages(pages)
+    if aggregator is not None:
+        report.update_words(aggregator.most_common(top_words))
+    elif legacy_json and os.path.exists(legacy_json):
+        report.update_words(read_json_counts(legacy_json))
+    return report
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(
+        description="Rebuilds the crawl report from the page records and "
+                    "the token frequencies in one streaming pass.")
+    parser.add_argument("--pages", type=str, default="page_records.bin")
+    parser.add_argument("--count_files", type=str, nargs=2,
+                        default=["all_webpage_count.txt", "all_webpage_count_no_stopwords.txt"],
+                        help="legacy page count files, imported when there are no page records")
+    parser.add_argument("--tokens", type=str, default="token_frequencies_nostop.json",
+                        help="legacy json totals, used when there is no checkpoint")
+    parser.add_argument("--checkpoint", type=str, default="token_frequencies.checkpoint.json")
+    parser.add_argument("--log", type=str, default="token_frequencies.log")
+    parser.add_argument("--output", type=str, default="report.txt")
+    args = parser.parse_args()
+
+    aggregator = None
+    if os.path.exists(args.checkpoint) or os.path.exists(args.log):
+        from utils.token_store import TokenAggregator
+        aggregator = TokenAggregator(args.checkpoint, args.log)
+    pages = PageStore(args.pages, legacy_files=args.count_files)
+    load_report(pages, aggregator, args.tokens).write(args.output)
+    pages.close()
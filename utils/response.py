@@ -5,10 +5,19 @@ class Response(object):
         self.url = resp_dict["url"]
         self.status = resp_dict["status"]
         self.error = resp_dict["error"] if "error" in resp_dict else None
-        try:
-            self.raw_response = (
-                pickle.loads(resp_dict["response"])
-                if "response" in resp_dict else
-                None)
-        except TypeError:
-            self.raw_response = None
+        # The page is unpickled on first use of raw_response, so responses
+        # that are dropped early (already visited, too large) never are.
+        self._pickled = resp_dict["response"] if "response" in resp_dict else None
+        self._raw_response = None
+        # Size of the pickled page in bytes, known without unpickling it.
+        self.size = len(self._pickled) if isinstance(self._pickled, bytes) else 0
+
+    @property
+    def raw_response(self):
+        if self._pickled is not None:
+            try:
+                self._raw_response = pickle.loads(self._pickled)
+            except TypeError:
+                self._raw_response = None
+            self._pickled = None
+        return self._raw_response
@@ -0,0 +1,104 @@
+import json
+import os
+import pickle
+import zlib
+from hashlib import sha256
+from threading import Lock
+
+import cbor
+
+from utils.response import Response
+
+
+class ResponseCache(object):
+    """
+    Content addressed store of downloaded responses, for recording a crawl
+    and replaying it offline.
+
+    Each response is kept as the cbor dict the cache server sends (url,
+    status, error and the pickled page), zlib compressed in
+    objects/<sha256[:2]>/<sha256> of its uncompressed bytes, so pages with
+    the same content are stored once. index.jsonl maps every requested url
+    to its object, one {"url", "hash"} line per download; the last line for
+    a url wins. Lines are appended with a single write each, so the shard
+    processes of a crawl can record into the same directory.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.objects = os.path.join(directory, "objects")
+        self.index_file = os.path.join(directory, "index.jsonl")
+        os.makedirs(self.objects, exist_ok=True)
+        self.lock = Lock()
+        self.index = dict()
+        if os.path.exists(self.index_file):
+            with open(self.index_file, "r") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Last line cut short by a crash.
+                        continue
+                    self.index[entry["url"]] = entry["hash"]
+        self.index_out = open(self.index_file, "a")
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, url):
+        return url in self.index
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects, digest[:2], digest)
+
+    def put(self, url, resp):
+        """ Stores resp as the response for url. """
+        resp_dict = {"url": resp.url, "status": resp.status}
+        if resp.error is not None:
+            resp_dict["error"] = resp.error
+        if resp.raw_response is not None:
+            resp_dict["response"] = pickle.dumps(resp.raw_response)
+        data = cbor.dumps(resp_dict)
+        digest = sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as file:
+                file.write(zlib.compress(data))
+            os.replace(tmp_path, path)
+        with self.lock:
+            self.index[url] = digest
+            self.index_out.write(json.dumps({"url": url, "hash": digest}) + "\n")
+            self.index_out.flush()
+
+    def get(self, url):
+        """ The stored Response for url, or None if it was not recorded. """
+        digest = self.index.get(url)
+        if digest is None:
+            return None
+        with open(self._object_path(digest), "rb") as file:
+            return Response(cbor.loads(zlib.decompress(file.read())))
+
+    def recorder(self, download):
+        """ Wraps a download function so every response it returns is stored. """
+        def record(url, config, logger=None):
+            resp = download(url, config, logger)
+            self.put(url, resp)
+            return resp
+        return record
+
+    def download(self, url, config=None, logger=None):
+        """ Replays the recorded response; same signature as utils.download. """
+        resp = self.get(url)
+        if resp is None:
+            if logger:
+                logger.error(f"No recorded response for {url}.")
+            return Response({
+                "error": f"No recorded response for {url}.",
+                "status": 404,
+                "url": url})
+        return resp
+
+    def close(self):
+        with self.lock:
+            self.index_out.close()
@@ -0,0 +1,119 @@
+import math
+import os
+from hashlib import blake2b
+from threading import Lock
+
+FINGERPRINT_BITS = 64
+
+
+def _token_hash(token):
+    return int.from_bytes(
+        blake2b(token.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(token_frequencies):
+    """
+    64 bit SimHash of a page from its {token: count} frequencies. Pages
+    sharing most of their weighted tokens get fingerprints that differ in
+    only a few bits. Tokens weigh 1 + log(count), so a few very frequent
+    words cannot make unrelated pages look alike.
+    """
+    # Sum the counts per (byte position, byte value) first, so each token
+    # costs 8 updates instead of 64; per-bit weights are derived after.
+    byte_sums = [[0] * 256 for _ in range(FINGERPRINT_BITS // 8)]
+    total = 0
+    for token, count in token_frequencies.items():
+        h = _token_hash(token)
+        weight = 1 + math.log(count)
+        total += weight
+        for sums in byte_sums:
+            sums[h & 0xff] += weight
+            h >>= 8
+    fingerprint = 0
+    for position, sums in enumerate(byte_sums):
+        for bit in range(8):
+            set_weight = sum(
+                weight for value, weight in enumerate(sums) if value >> bit & 1)
+            # weight of the bit: +weight where it is set, -weight otherwise.
+            if 2 * set_weight > total:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+class SimHashIndex(object):
+    """
+    Finds fingerprints within `max_distance` bits (Hamming distance) of a
+    query without scanning the whole index.
+
+    The 64 bits are cut into max_distance + 1 bands. Two fingerprints that
+    differ in at most max_distance bits agree exactly on at least one band,
+    so only fingerprints sharing a band value with the query are compared.
+    Fingerprints are appended to `save_file` (one "fingerprint url" line
+    per page) and reloaded on first use, so the index survives restarts.
+    """
+    def __init__(self, save_file=None, max_distance=3):
+        self.save_file = save_file
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        width = FINGERPRINT_BITS // bands
+        self.bands = [
+            (i * width, width if i < bands - 1 else FINGERPRINT_BITS - i * width)
+            for i in range(bands)]
+        self.tables = None
+        self._lock = Lock()
+
+    def _band_keys(self, fingerprint):
+        for i, (shift, width) in enumerate(self.bands):
+            yield i, (fingerprint >> shift) & ((1 << width) - 1)
+
+    def _insert(self, fingerprint, url):
+        for i, key in self._band_keys(fingerprint):
+            self.tables[i].setdefault(key, list()).append((fingerprint, url))
+
+    def _load(self):
+        self.tables = [dict() for _ in self.bands]
+        if self.save_file and os.path.exists(self.save_file):
+            with open(self.save_file, "r") as file:
+                for line in file:
+                    fingerprint, _, url = line.rstrip("\n").partition(" ")
+                    if url:
+                        self._insert(int(fingerprint, 16), url)
+
+    def _find(self, fingerprint, exclude_url=None):
+        for i, key in self._band_keys(fingerprint):
+            for other, url in self.tables[i].get(key, ()):
+                if url == exclude_url:
+                    continue
+                if bin(fingerprint ^ other).count("1") <= self.max_distance:
+                    return url
+        return None
+
+    def find(self, fingerprint):
+        """ Returns the url of a near-duplicate page, or None. """
+        with self._lock:
+            if self.tables is None:
+                self._load()
+            return self._find(fingerprint)
+
+    def find_or_add(self, fingerprint, url):
+        """
+        Returns the url of a near-duplicate page if there is one, otherwise
+        adds the fingerprint for url and returns None. The url's own earlier
+        fingerprints are not duplicates: a page downloaded again after a
+        restart (its fingerprint was saved, its page record not yet) or in
+        a re-crawl matches itself.
+        """
+        with self._lock:
+            if self.tables is None:
+                self._load()
+            duplicate = self._find(fingerprint, url)
+            if duplicate:
+                return duplicate
+            _, key = next(self._band_keys(fingerprint))
+            if (fingerprint, url) in self.tables[0].get(key, ()):
+                return None
+            self._insert(fingerprint, url)
+            if self.save_file:
+                with open(self.save_file, "a") as file:
+                    file.write(f"{fingerprint:016x} {url}\n")
+            return None
@@ -0,0 +1,75 @@
+import pickle
+from http.server import BaseHTTPRequestHandler
+from threading import Thread
+from urllib.parse import urlparse, parse_qs
+
+import cbor
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from utils.metrics import ThreadedHTTPServer
+
+
+def make_raw_response(url, status, content, headers=None):
+    """ Builds the requests.Response the cache server pickles for a page. """
+    raw_response = requests.models.Response()
+    raw_response.url = url
+    raw_response.status_code = status
+    raw_response._content = content
+    raw_response.headers = CaseInsensitiveDict(headers or {})
+    raw_response.encoding = "utf-8"
+    return raw_response
+
+
+class StubCacheServer(object):
+    """
+    Local stand-in for the spacetime cache server, for offline runs.
+
+    Serves the same protocol as the real one: GET /?q=<url>&u=<useragent>
+    returns a cbor encoded dict with url, status and the pickled response.
+    `pages` maps urls to (status, content bytes[, headers]); unknown urls get
+    a 404 page. Every request is recorded in `requests` as (url, useragent).
+
+        server = StubCacheServer(pages).start()
+        config.cache_server = server.address
+        ...
+        server.stop()
+    """
+    def __init__(self, pages, host="127.0.0.1", port=0):
+        self.pages = pages
+        self.requests = list()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                url = query.get("q", [""])[0]
+                stub.requests.append((url, query.get("u", [""])[0]))
+                page = stub.pages.get(url, (404, b"Not Found"))
+                status, content = page[0], page[1]
+                headers = page[2] if len(page) > 2 else None
+                body = cbor.dumps({
+                    "url": url, "status": status,
+                    "response": pickle.dumps(
+                        make_raw_response(url, status, content, headers))})
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadedHTTPServer((host, port), Handler)
+        self.address = self.server.server_address[:2]
+        self.thread = Thread(target=self.server.serve_forever, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,156 @@
+import json
+import os
+import time
+from collections import Counter
+from threading import RLock
+
+
+class TokenAggregator(object):
+    """
+    Running token frequency totals kept in memory.
+
+    Page counts are buffered and flushed as one delta record to an
+    append-only log every `flush_pages` pages or `flush_seconds` seconds.
+    Every `checkpoint_every` flushes the full totals are written atomically
+    to the checkpoint file and the log is truncated. Each log record carries
+    a sequence number and the checkpoint remembers the last one it contains,
+    so after a crash the exact totals are rebuilt by loading the checkpoint
+    and replaying only the newer, complete log records.
+    """
+    def __init__(self, checkpoint_file, log_file, flush_pages=50,
+                 flush_seconds=30.0, checkpoint_every=20, legacy_files=None):
+        self.checkpoint_file = checkpoint_file
+        self.log_file = log_file
+        self.flush_pages = flush_pages
+        self.flush_seconds = flush_seconds
+        self.checkpoint_every = checkpoint_every
+        # (all, nostop) json files written by older versions of tokenizer.
+        self.legacy_files = legacy_files
+        self._lock = RLock()
+        self._loaded = False
+
+    def _load(self):
+        self.totals = Counter()
+        self.totals_nostop = Counter()
+        self.seq = 0
+        self._pending = Counter()
+        self._pending_nostop = Counter()
+        self._pending_pages = 0
+        self._last_flush = time.monotonic()
+        self._flushes_since_checkpoint = 0
+
+        if os.path.exists(self.checkpoint_file):
+            with open(self.checkpoint_file, "r") as f:
+                checkpoint = json.load(f)
+            self.seq = checkpoint["seq"]
+            self.totals.update(checkpoint["all"])
+            self.totals_nostop.update(checkpoint["nostop"])
+        elif self.legacy_files and os.path.exists(self.legacy_files[0]):
+            with open(self.legacy_files[0], "r") as f:
+                self.totals.update(json.load(f))
+            if os.path.exists(self.legacy_files[1]):
+                with open(self.legacy_files[1], "r") as f:
+                    self.totals_nostop.update(json.load(f))
+
+        if os.path.exists(self.log_file):
+            good_bytes = 0
+            with open(self.log_file, "rb") as f:
+                for line in f:
+                    try:
+                        if not line.endswith(b"\n"):
+                            raise ValueError("incomplete record")
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn write at the end of the log, nothing follows.
+                        break
+                    good_bytes += len(line)
+                    if record["seq"] <= self.seq:
+                        continue
+                    self.seq = record["seq"]
+                    self.totals.update(record["all"])
+                    self.totals_nostop.update(record["nostop"])
+                    self._flushes_since_checkpoint += 1
+            # Drop a torn tail so new records are not appended behind it.
+            os.truncate(self.log_file, good_bytes)
+        self._loaded = True
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+
+    def add_page(self, counts, counts_nostop):
+        """ Adds the token counts of one page to the totals. """
+        self._ensure_loaded()
+        with self._lock:
+            self.totals.update(counts)
+            self.totals_nostop.update(counts_nostop)
+            self._pending.update(counts)
+            self._pending_nostop.update(counts_nostop)
+            self._pending_pages += 1
+            if (self._pending_pages >= self.flush_pages
+                    or time.monotonic() - self._last_flush >= self.flush_seconds):
+                self.flush()
+
+    def flush(self):
+        """ Appends the buffered page counts to the log. """
+        if not self._loaded:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not self._pending_pages:
+                return
+            self.seq += 1
+            record = {"seq": self.seq, "all": self._pending,
+                      "nostop": self._pending_nostop}
+            with open(self.log_file, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = Counter()
+            self._pending_nostop = Counter()
+            self._pending_pages = 0
+            self._flushes_since_checkpoint += 1
+            if self._flushes_since_checkpoint >= self.checkpoint_every:
+                self.checkpoint()
+
+    def checkpoint(self):
+        """ Writes the full totals atomically and truncates the log. """
+        self._ensure_loaded()
+        with self._lock:
+            tmp_file = f"{self.checkpoint_file}.tmp"
+            with open(tmp_file, "w") as f:
+                json.dump({"seq": self.seq, "all": self.totals,
+                           "nostop": self.totals_nostop}, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.checkpoint_file)
+            # Records up to self.seq are in the checkpoint now.
+            open(self.log_file, "w").close()
+            # Buffered counts are already part of the totals just written.
+            self._pending = Counter()
+            self._pending_nostop = Counter()
+            self._pending_pages = 0
+            self._flushes_since_checkpoint = 0
+
+    def close(self):
+        if self._loaded:
+            self.checkpoint()
+
+    def most_common(self, n=50, stopwords=False):
+        """
+        Returns the n most frequent (token, count) pairs, without stopwords
+        unless stopwords is True.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            totals = self.totals if stopwords else self.totals_nostop
+            return totals.most_common(n)
+
+    def totals_for(self, tokens, stopwords=False):
+        """ Returns a list of (token, total count) for the given tokens. """
+        self._ensure_loaded()
+        with self._lock:
+            totals = self.totals if stopwords else self.totals_nostop
+            return [(token, totals[token]) for token in tokens]
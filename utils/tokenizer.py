@@ -0,0 +1,94 @@
+import re
+import string
+from collections import Counter
+from itertools import chain, islice
+
+STOPWORDS = frozenset({
+    "a", "about", "above", "after", "again", "against", "all", "am", "an", "and", "any", "are",
+    "aren't", "as", "at", "be", "because", "been", "before", "being", "below", "between", "both",
+    "but", "by", "can't", "cannot", "could", "couldn't", "did", "didn't", "do", "does", "doesn't",
+    "doing", "don't", "down", "during", "each", "few", "for", "from", "further", "had", "hadn't",
+    "has", "hasn't", "have", "haven't", "having", "he", "he'd", "he'll", "he's", "her", "here",
+    "here's", "hers", "herself", "him", "himself", "his", "how", "how's", "i", "i'd", "i'll", "i'm",
+    "i've", "if", "in", "into", "is", "isn't", "it", "it's", "its", "itself", "let's", "me", "more",
+    "most", "mustn't", "my", "myself", "no", "nor", "not", "of", "off", "on", "once", "only", "or",
+    "other", "ought", "our", "ours", "ourselves", "out", "over", "own", "same", "shan't", "she",
+    "she'd", "she'll", "she's", "should", "shouldn't", "so", "some", "such", "than", "that", "that's",
+    "the", "their", "theirs", "them", "themselves", "then", "there", "there's", "these", "they",
+    "they'd", "they'll", "they're", "they've", "this", "those", "through", "to", "too", "under",
+    "until", "up", "very", "was", "wasn't", "we", "we'd", "we'll", "we're", "we've", "were", "weren't",
+    "what", "what's", "when", "when's", "where", "where's", "which", "while", "who", "who's", "whom",
+    "why", "why's", "with", "won't", "would", "wouldn't", "you", "you'd", "you'll", "you're", "you've",
+    "your", "yours", "yourself", "yourselves"})
+
+# Punctuation separates tokens, except apostrophes inside a word so that
+# "don't" stays one token (and a stopword).
+_SEPARATORS = dict.fromkeys(string.punctuation.replace("'", "") + "“”‘–—…«»•·", " ")
+_SEPARATORS.update({"’": "'"})
+PUNCTUATION = str.maketrans(_SEPARATORS)
+# An apostrophe not between two word characters; starts with the literal so
+# the regex engine can skip ahead to candidate positions.
+OUTER_APOSTROPHE = re.compile(r"'(?:(?<!\w')|(?!\w))")
+# Text nodes are joined into chunks of about this many characters, so that
+# lowercasing and splitting run on a few large strings instead of many
+# small ones.
+CHUNK_CHARS = 1 << 16
+
+
+class Tokenizer(object):
+    """
+    Turns the text nodes of a page into token counts.
+
+    The nodes are joined into chunks, and each chunk is lowercased and
+    split by str.split, after punctuation was turned into spaces by one
+    str.translate if it is stripped ("research," and "research" are then
+    the same token). The tokens are counted by Counter, and the stopword
+    free counts are derived from the distinct tokens rather than from
+    every occurrence. With drop_numbers, tokens made of digits only are
+    not counted.
+    """
+    def __init__(self, strip_punctuation=True, drop_numbers=False, stopwords=STOPWORDS):
+        self.strip_punctuation = strip_punctuation
+        self.drop_numbers = drop_numbers
+        self.stopwords = stopwords
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config.strip_punctuation, config.drop_numbers)
+
+    @staticmethod
+    def _chunks(text):
+        chunk = list()
+        size = 0
+        for node in text:
+            chunk.append(node)
+            size += len(node)
+            if size >= CHUNK_CHARS:
+                yield " ".join(chunk)
+                chunk = list()
+                size = 0
+        if chunk:
+            yield " ".join(chunk)
+
+    def _split(self, chunk):
+        chunk = chunk.lower()
+        if self.strip_punctuation:
+            chunk = chunk.translate(PUNCTUATION)
+            if "'" in chunk:
+                chunk = OUTER_APOSTROPHE.sub(" ", chunk)
+        return chunk.split()
+
+    def tokens(self, text, limit=None):
+        """ The normalized tokens of the text nodes, at most limit of them. """
+        tokens = chain.from_iterable(self._split(chunk) for chunk in self._chunks(text))
+        if self.drop_numbers:
+            tokens = (token for token in tokens if not token.isdigit())
+        return islice(tokens, limit)
+
+    def count(self, text, limit=None):
+        """ Returns the (all tokens, stopwords excluded) counts of the text. """
+        counts = Counter(self.tokens(text, limit))
+        stopwords = self.stopwords
+        counts_nostop = Counter({
+            token: count for token, count in counts.items() if token not in stopwords})
+        return counts, counts_nostop
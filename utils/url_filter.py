@@ -0,0 +1,106 @@
+import re
+from functools import lru_cache
+from urllib.parse import urlparse
+
+# Domain needs to be one of these, allows subdomains.
+DOMAINS = r"(.*\.)?(ics|cs|informatics|stat)\.uci\.edu"
+
+# Paths can't have any "2000-01-03" etc.
+DATES = r"\b\d{4}-\d{2}-\d{2}\b"
+
+# Paths ending with these extensions do not point to webpages.
+EXTENSIONS = (
+    "css", "js", "bmp", "gif", "jpg", "jpeg", "ico", "img", "sql", "ipynb",
+    "war", "bam", "mpg", "ppsx", "png", "tif", "tiff", "mid", "mp2", "mp3",
+    "mp4", "wav", "avi", "mov", "mpeg", "ram", "m4v", "mkv", "ogg", "ogv",
+    "pdf", "ps", "eps", "tex", "ppt", "pptx", "doc", "docx", "xls", "xlsx",
+    "names", "data", "dat", "exe", "bz2", "tar", "msi", "bin", "7z", "psd",
+    "dmg", "iso", "epub", "dll", "cnf", "tgz", "sha1", "thmx", "mso", "arff",
+    "rtf", "jar", "csv", "rm", "smil", "wmv", "swf", "wma", "zip", "rar", "gz")
+
+# Substrings of the url that lead into known crawler traps.
+TRAPS = (
+    "/pdf/", "archive.ics.uci.edu", "Nanda", "timeline?", "version=",
+    "action=login", "action=download", "ics.uci.edu/events",
+    "isg.ics.uci.edu/events/tag/talks/day", "share=facebook", "share=twitter",
+    ".pdf", ".ps")
+
+# Query keywords (case insensitive) of calendars and excessive dates.
+QUERY_KEYWORDS = (
+    "ical=", "outlook-ical=", "tribe-bar-date=", "eventdate=", "calendar-view",
+    "date=")
+
+
+def _split_rule(value):
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+class UrlFilter(object):
+    """
+    The is_valid rules compiled once: the domain and date patterns, a
+    suffix set for the extensions and a single regex alternation matching
+    any trap substring in the url or any keyword in its query. Verdicts are
+    memoized per url in an LRU cache, since the same links repeat across
+    many pages.
+    """
+    def __init__(self, domains=DOMAINS, dates=DATES, extensions=EXTENSIONS,
+                 traps=TRAPS, query_keywords=QUERY_KEYWORDS, cache_size=65536,
+                 logger=None):
+        self.logger = logger
+        self.domains = re.compile(domains)
+        self.dates = re.compile(dates)
+        self.extensions = frozenset(ext.lower() for ext in extensions)
+        alternatives = [re.escape(trap) for trap in traps]
+        if query_keywords:
+            # Keywords only count in the query, i.e. after the first '?'.
+            alternatives.append(
+                r"\?[^#]*(?i:" + "|".join(
+                    re.escape(keyword) for keyword in query_keywords) + ")")
+        self.blocked = re.compile("|".join(alternatives)) if alternatives else None
+        self.is_valid = lru_cache(maxsize=cache_size)(self._is_valid)
+
+    @classmethod
+    def from_rules(cls, rules, logger=None):
+        """
+        Builds a filter from a [FILTER] config section. Every key is
+        optional and falls back to the built-in rules: DOMAINS and DATES are
+        regexes, EXTENSIONS, TRAPS and QUERYKEYWORDS comma separated lists.
+        """
+        rules = {key.upper(): value for key, value in rules.items()}
+        kwargs = dict()
+        for key, name in (("DOMAINS", "domains"), ("DATES", "dates")):
+            if key in rules:
+                kwargs[name] = rules[key].strip()
+        for key, name in (("EXTENSIONS", "extensions"), ("TRAPS", "traps"),
+                          ("QUERYKEYWORDS", "query_keywords")):
+            if key in rules:
+                kwargs[name] = _split_rule(rules[key])
+        if "CACHESIZE" in rules:
+            kwargs["cache_size"] = int(rules["CACHESIZE"])
+        return cls(logger=logger, **kwargs)
+
+    def _is_valid(self, url):
+        parsed = urlparse(url)
+        if parsed.scheme not in {"http", "https"}:
+            return False
+
+        # Ensures that there is a hostname before examining the URL
+        if not parsed.hostname:
+            return False
+
+        if not self.domains.match(parsed.hostname):
+            return False
+
+        if self.dates.search(parsed.path):
+            if self.logger:
+                self.logger.info(f"Date in url: {url}")
+            return False
+
+        # Traps anywhere in the url, calendar keywords in the query.
+        if self.blocked and self.blocked.search(parsed.geturl()):
+            return False
+
+        # Rejects the URL if it ends with any of the extensions.
+        last_segment = parsed.path.rsplit("/", 1)[-1]
+        _, dot, extension = last_segment.rpartition(".")
+        return not (dot and extension.lower() in self.extensions)
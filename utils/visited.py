@@ -0,0 +1,46 @@
+from threading import Lock
+from urllib.parse import urldefrag
+
+
+def canonicalize(url):
+    """
+    Canonical form used to decide whether two urls are the same page:
+    %7E is decoded to ~, the fragment is dropped and a leading www. removed.
+    """
+    decoded_url = url.replace("%7E", "~")
+    base_url, _ = urldefrag(decoded_url)
+    return base_url.replace("/www.", "/")
+
+
+class VisitedIndex(object):
+    """
+    In-memory set of visited pages backed by the page records (see
+    utils/page_store.py). Their urls are read once on first use; pages
+    recorded afterwards are added to the set directly, so lookups never
+    touch the disk again.
+    """
+    def __init__(self, pages):
+        self.pages = pages
+        self._urls = None
+        self._lock = Lock()
+
+    def _load(self):
+        return {canonicalize(url) for url in self.pages.urls()}
+
+    def _urls_loaded(self):
+        if self._urls is None:
+            with self._lock:
+                if self._urls is None:
+                    self._urls = self._load()
+        return self._urls
+
+    def __contains__(self, url):
+        return canonicalize(url) in self._urls_loaded()
+
+    def __len__(self):
+        return len(self._urls_loaded())
+
+    def add(self, url):
+        urls = self._urls_loaded()
+        with self._lock:
+            urls.add(canonicalize(url))